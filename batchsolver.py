@@ -0,0 +1,180 @@
+import time
+
+import numpy as np
+
+from candidategrid import CandidateGrid
+from strategies import solve
+
+# Batch solver
+# Many puzzles at once as an (N, 81, 9) boolean tensor of candidates.
+# Naked and hidden singles are applied to all of them with array reductions
+# over the houses; only the puzzles singles cannot finish go on
+# to the per-puzzle strategy cascade in solve().
+#################################################
+
+# The three kinds of houses are reductions over reshaped views of the
+# tensor, in the house order of indextables.py:
+# houses 0-8 fix i, houses 9-17 fix j, houses 18-26 are the blocks.
+
+
+# sum over one short axis as uint8, slice by slice: much faster than
+# a NumPy reduction over a length-3 or length-9 axis
+def _count_along(x, axis):
+    parts = np.moveaxis(x, axis, 0)
+    total = parts[0].astype(np.uint8)
+    for part in parts[1:]:
+        total += part
+    return total
+
+
+# (N, 81, 9) bool -> (N, 27, 9) how many cells of each house hold each number
+def per_house_count(x):
+    g = x.reshape(-1, 9, 9, 9).view(np.uint8)
+    fixed_i = _count_along(g, 2)
+    fixed_j = _count_along(g, 1)
+    blocks = _count_along(_count_along(g.reshape(-1, 3, 3, 3, 3, 9), 4), 2)
+    return np.concatenate([fixed_i, fixed_j, blocks.reshape(-1, 9, 9)],
+                          axis=1)
+
+
+# (N, 27, 9) bool per house -> (N, 81, 9), OR over the houses of each cell
+def spread_to_cells(h):
+    n = len(h)
+    cells = h[:, 0:9, None, :] | h[:, None, 9:18, :]
+    blocks = h[:, 18:27].reshape(n, 3, 1, 3, 1, 9)
+    spread = cells.reshape(n, 3, 3, 3, 3, 9)
+    spread |= blocks
+    return cells.reshape(n, 81, 9)
+
+
+def n_candidates(cand):
+    return _count_along(cand.view(np.uint8), 2)
+
+
+# (N, 81) numbers, 0 for empty cells -> (N, 81, 9) candidates
+def candidates_tensor(puzzles):
+    puzzles = np.asarray(puzzles).reshape(-1, 81)
+    cand = np.ones(puzzles.shape + (9,), dtype=bool)
+    given = puzzles > 0
+    cand[given] = np.arange(1, 10) == puzzles[given][:, None]
+    return cand
+
+
+# remove the numbers of solved cells from their houses,
+# returns (new candidates, candidates removed per puzzle, broken per puzzle)
+def naked_singles(cand):
+    placed = cand & (n_candidates(cand) == 1)[:, :, None]
+    per_house = per_house_count(placed)
+    broken = (per_house > 1).any(axis=(1, 2))
+    taken = spread_to_cells(per_house > 0)
+    new = cand & ~(taken & ~placed)
+    removed = (cand.sum(axis=(1, 2), dtype=np.int32) -
+               new.sum(axis=(1, 2), dtype=np.int32))
+    return new, removed, broken
+
+
+# put every number that has one place left in a house there,
+# returns (new candidates, candidates removed per puzzle, broken per puzzle)
+def hidden_singles(cand):
+    per_house = per_house_count(cand)
+    broken = (per_house == 0).any(axis=(1, 2))
+    hidden = cand & spread_to_cells(per_house == 1)
+    n_hidden = n_candidates(hidden)
+    n_cand = n_candidates(cand)
+    broken |= (n_hidden > 1).any(axis=1)
+    place = (n_hidden == 1) & (n_cand > 1)
+    new = np.where(place[:, :, None], hidden, cand)
+    removed = np.where(place, n_cand - 1, 0).sum(axis=1, dtype=np.int32)
+    return new, removed, broken
+
+
+def singles(cand, stats=None):
+    """Run naked and hidden singles on all puzzles until none changes.
+
+    Like the propagator, a puzzle only gets a round of hidden singles once
+    naked singles have nothing left to remove in it. Returns (candidates,
+    naked removed, hidden removed, broken), all per puzzle. Each puzzle in
+    a round counts as one call in stats, if given.
+    """
+    n = len(cand)
+    naked = np.zeros(n, dtype=np.int64)
+    hidden = np.zeros(n, dtype=np.int64)
+    broken = np.zeros(n, dtype=bool)
+    active = np.arange(n)
+    while len(active):
+        t = time.perf_counter_ns()
+        sub, removed, sub_broken = naked_singles(cand[active])
+        if stats is not None:
+            stats.record(0, int(removed.sum()), time.perf_counter_ns() - t,
+                         len(active), int((removed > 0).sum()))
+        naked[active] += removed
+        changed = removed > 0
+
+        # puzzles where naked singles ran dry get a round of hidden singles
+        idle = ~changed & ~sub_broken
+        if idle.any():
+            t = time.perf_counter_ns()
+            sub_idle, removed, b = hidden_singles(sub[idle])
+            if stats is not None:
+                stats.record(1, int(removed.sum()),
+                             time.perf_counter_ns() - t,
+                             len(removed), int((removed > 0).sum()))
+            sub[idle] = sub_idle
+            hidden[active[idle]] += removed
+            sub_broken[idle] |= b
+            changed[idle] = removed > 0
+
+        cand[active] = sub
+        broken[active] |= sub_broken
+        # keep going only with puzzles that changed in this round
+        active = active[changed & ~sub_broken]
+    return cand, naked, hidden, broken
+
+
+# (81, 9) candidates of one puzzle -> CandidateGrid
+def to_grid(cand):
+    return CandidateGrid((cand * (1 << np.arange(9))).sum(axis=1).tolist())
+
+
+def solve_batch(puzzles, backend="logic", chunk_size=10000, stats=None,
+                scheduler=None, cache=None):
+    """Solve many puzzles, singles vectorized over the whole batch.
+
+    puzzles: (N, 81) or (N, 9, 9) numbers, 0 for empty cells.
+    Returns (solutions, reports, times): (N, 81) uint8 solutions (0 where a
+    puzzle turned out broken), the usual 7-count report per puzzle and the
+    time spent per puzzle, with the batch part shared out evenly.
+    stats, a StrategyStats, collects the calls and time of every method;
+    scheduler and cache are passed on to solve() for the puzzles singles
+    leave.
+    """
+    puzzles = np.asarray(puzzles).reshape(-1, 81)
+    solutions = np.zeros(puzzles.shape, dtype=np.uint8)
+    reports = []
+    times = np.zeros(len(puzzles))
+
+    for start in range(0, len(puzzles), chunk_size):
+        chunk = puzzles[start:start + chunk_size]
+        t = time.perf_counter()
+        cand, naked, hidden, broken = singles(candidates_tensor(chunk),
+                                         stats)
+        solved = (cand.sum(axis=2) == 1).all(axis=1) & ~broken
+        times[start:start + len(chunk)] = \
+            (time.perf_counter() - t) / len(chunk)
+
+        solutions[start:start + len(chunk)][solved] = \
+            cand[solved].argmax(axis=2) + 1
+        chunk_reports = np.zeros((len(chunk), 7), dtype=np.int64)
+        chunk_reports[:, 0] = naked
+        chunk_reports[:, 1] = hidden
+        chunk_reports = chunk_reports.tolist()
+
+        for i in np.flatnonzero(~solved):
+            t = time.perf_counter()
+            puzzle, _ = solve(to_grid(cand[i]), False, backend,
+                              report=chunk_reports[i], stats=stats,
+                              scheduler=scheduler, cache=cache)
+            solutions[start + i] = puzzle.to_array().ravel()
+            times[start + i] += time.perf_counter() - t
+        reports += chunk_reports
+    return solutions, reports, times
@@ -0,0 +1,261 @@
+import argparse
+import hashlib
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+from batchsolver import solve_batch
+from helperfunctions import parse_puzzles
+from instrumentation import StrategyStats
+from main import iter_puzzle_chunks
+from scheduler import make_scheduler, schedulers
+from strategies import solve
+
+# Benchmark suite
+# Fixed corpora, solved without any printing, so that runs on different
+# commits can be compared:
+#   - per difficulty tier, a seeded sample of sudoku-3m.csv, written once to
+#     a corpus file that is then reused as is
+#   - a few notorious hard puzzles
+# Every corpus gets warm-up runs and then `repeat` timed runs; the fastest
+# run is reported, with puzzles/sec, per-puzzle time quantiles and the
+# per-strategy calls and times of that run. The result is written as JSON
+# with sorted keys so two files diff cleanly, and --compare checks a run
+# against an earlier one.
+# Import times are measured too, each in a fresh interpreter: the solver
+# core must not pull in any of the plotting/analysis packages.
+#################################################
+
+hard_puzzles = {
+    "AI Escargot":
+        "1....7.9..3..2...8..96..5....53..9...1..8...26....4...3......1..4......7..7...3..",
+    "Inkala 2012":
+        "8..........36......7..9.2...5...7.......457.....1...3...1....68..85...1..9....4..",
+    "Easter Monster":
+        "1.......2.9.4...5...6...7...5.9.3.......7.......85..4.7.....6...3...9.8...2.....1",
+}
+
+tiers = ("Easy", "Medium", "Difficult")
+
+# modules a library user imports, and what they must not drag along
+core_modules = ("strategies", "batchsolver", "solverapi", "puzzlestore")
+heavy_modules = ("matplotlib", "seaborn", "sklearn", "scipy", "pandas")
+
+_import_code = """import json, sys, time
+t = time.perf_counter()
+import %s
+t = time.perf_counter() - t
+print(json.dumps({"seconds": t,
+                  "heavy": sorted(m for m in %r if m in sys.modules)}))
+"""
+
+
+def sample_corpora(filename, per_tier, seed, chunk_size=200000):
+    """{tier: puzzle lines}, per_tier puzzles of each tier drawn with the seed.
+
+    One pass over the CSV: every row gets a seeded random key and the
+    per_tier smallest keys of each tier are kept.
+    """
+    rng = np.random.default_rng(seed)
+    kept = {tier: ([], []) for tier in tiers}
+    for chunk in iter_puzzle_chunks(filename, columns=['puzzle', 'difficulty'],
+                                    chunk_size=chunk_size):
+        keys = rng.random(len(chunk))
+        for tier in tiers:
+            in_tier = (chunk['difficulty'] == tier).to_numpy()
+            tier_keys, lines = kept[tier]
+            tier_keys = np.concatenate([tier_keys, keys[in_tier]])
+            lines = lines + list(chunk['puzzle'][in_tier])
+            best = np.argsort(tier_keys, kind="stable")[:per_tier]
+            kept[tier] = (tier_keys[best], [lines[i] for i in best])
+    return {tier: kept[tier][1] for tier in tiers}
+
+
+def load_corpora(corpus_file, csv_filename, per_tier, seed):
+    """The corpora of corpus_file, sampled from the CSV and saved first if needed."""
+    if os.path.exists(corpus_file):
+        with open(corpus_file) as f:
+            return json.load(f)
+    corpora = sample_corpora(csv_filename, per_tier, seed)
+    with open(corpus_file, "w") as f:
+        json.dump(corpora, f, indent=1)
+    return corpora
+
+
+def corpus_digest(lines):
+    return hashlib.sha1("".join(lines).encode("ascii")).hexdigest()
+
+
+# one timed run: (total seconds, per-puzzle seconds, StrategyStats),
+# with a fresh scheduler so learning ones start from scratch every run
+def run_once(puzzles, mode, scheduler="fixed"):
+    stats = StrategyStats()
+    policy = make_scheduler(scheduler)
+    if mode == "batch":
+        start = time.perf_counter()
+        _, _, times = solve_batch(puzzles, stats=stats, scheduler=policy)
+        return time.perf_counter() - start, np.asarray(times), stats
+    times = np.zeros(len(puzzles))
+    start = time.perf_counter()
+    for i, puzzle in enumerate(puzzles):
+        t = time.perf_counter()
+        solve(puzzle.reshape(9, 9), False, backend=mode, stats=stats,
+              scheduler=policy)
+        times[i] = time.perf_counter() - t
+    return time.perf_counter() - start, times, stats
+
+
+def bench_corpus(lines, mode, warmup, repeat, scheduler="fixed"):
+    puzzles = parse_puzzles(lines)
+    if warmup:
+        run_once(puzzles[:warmup], mode, scheduler)
+    best = None
+    for _ in range(repeat):
+        run = run_once(puzzles, mode, scheduler)
+        if best is None or run[0] < best[0]:
+            best = run
+    total, times, stats = best
+    return {
+        "puzzles": len(puzzles),
+        "total_s": total,
+        "puzzles_per_s": len(puzzles) / total if total > 0 else 0.0,
+        "mean_s": float(times.mean()),
+        "p50_s": float(np.quantile(times, 0.5)),
+        "p95_s": float(np.quantile(times, 0.95)),
+        "max_s": float(times.max()),
+        "strategies": stats.as_dict(),
+    }
+
+
+def git_commit():
+    try:
+        out = subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True,
+                             text=True, cwd=os.path.dirname(os.path.abspath(__file__)))
+        return out.stdout.strip() or None
+    except OSError:
+        return None
+
+
+def import_times(modules=core_modules + ("main",), repeat=3):
+    """{module: {"seconds", "heavy"}}, the best of repeat fresh imports."""
+    here = os.path.dirname(os.path.abspath(__file__))
+    times = {}
+    for module in modules:
+        best = None
+        for _ in range(repeat):
+            out = subprocess.run([sys.executable, "-c",
+                                  _import_code % (module, heavy_modules)],
+                                 capture_output=True, text=True, cwd=here,
+                                 check=True)
+            r = json.loads(out.stdout.strip().splitlines()[-1])
+            if best is None or r["seconds"] < best["seconds"]:
+                best = r
+        times[module] = best
+    return times
+
+
+def check_imports(times):
+    """Print the import times, False if a core module loads a heavy one."""
+    ok = True
+    for module, r in times.items():
+        heavy = r["heavy"] if module in core_modules else []
+        ok &= not heavy
+        print("import %-12s %8.3fs%s" % (module, r["seconds"],
+              "  PULLS IN " + ", ".join(heavy) if heavy else ""))
+    return ok
+
+
+def run_benchmark(corpora, modes=("logic",), warmup=5, repeat=3,
+                  scheduler="fixed"):
+    result = {
+        "meta": {
+            "commit": git_commit(),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "machine": platform.machine(),
+            "processor": platform.processor(),
+            "warmup": warmup,
+            "repeat": repeat,
+            "scheduler": scheduler,
+        },
+        "corpora": {name: {"puzzles": len(lines), "sha1": corpus_digest(lines)}
+                    for name, lines in corpora.items()},
+        "results": {},
+        "imports": import_times(),
+    }
+    imports_ok = check_imports(result["imports"])
+    result["meta"]["imports_ok"] = imports_ok
+    for mode in modes:
+        result["results"][mode] = {}
+        for name, lines in corpora.items():
+            print("%-10s %-16s" % (mode, name), end=" ", flush=True)
+            r = bench_corpus(lines, mode, min(warmup, len(lines)), repeat,
+                             scheduler)
+            result["results"][mode][name] = r
+            print("%8d puzzles %10.1f puzzles/s  p50 %.4fs  p95 %.4fs" %
+                  (r["puzzles"], r["puzzles_per_s"], r["p50_s"], r["p95_s"]))
+    return result
+
+
+def compare(old, new, tolerance):
+    """Print the throughput change per corpus, True if none got slower than tolerance."""
+    ok = True
+    for mode, corpora in new["results"].items():
+        for name, r in corpora.items():
+            before = old.get("results", {}).get(mode, {}).get(name)
+            if before is None:
+                continue
+            if old["corpora"].get(name, {}).get("sha1") != new["corpora"][name]["sha1"]:
+                print("%-10s %-16s corpus changed, not compared" % (mode, name))
+                continue
+            ratio = r["puzzles_per_s"] / before["puzzles_per_s"]
+            slower = ratio < 1 - tolerance
+            ok &= not slower
+            print("%-10s %-16s %6.2fx%s" % (mode, name, ratio,
+                                             "  REGRESSION" if slower else ""))
+    return ok
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the Sudoku solver.")
+    parser.add_argument("--csv", default="sudoku-3m.csv")
+    parser.add_argument("--corpus", default="benchmark_corpus.json",
+                        help="corpus file, sampled from the CSV if missing")
+    parser.add_argument("--per-tier", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=2024)
+    parser.add_argument("--modes", default="logic",
+                        help="comma separated: logic, logic+dlx, dlx, batch")
+    parser.add_argument("--scheduler", default="fixed",
+                        help="strategy scheduler: " + ", ".join(schedulers))
+    parser.add_argument("--warmup", type=int, default=5)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--output", default="benchmark.json")
+    parser.add_argument("--compare", help="earlier benchmark JSON to check against")
+    parser.add_argument("--tolerance", type=float, default=0.10,
+                        help="allowed throughput loss in --compare")
+    args = parser.parse_args(argv)
+
+    corpora = load_corpora(args.corpus, args.csv, args.per_tier, args.seed)
+    corpora["Hard"] = list(hard_puzzles.values())
+    result = run_benchmark(corpora, args.modes.split(","), args.warmup,
+                           args.repeat, args.scheduler)
+    with open(args.output, "w") as f:
+        json.dump(result, f, indent=1, sort_keys=True)
+    print("Wrote", args.output)
+
+    if not result["meta"]["imports_ok"]:
+        return 1
+    if args.compare:
+        with open(args.compare) as f:
+            if not compare(json.load(f), result, args.tolerance):
+                return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,126 @@
+import array
+
+import numpy as np
+
+# Candidate grid
+# Every cell is a 9-bit mask: bit (n - 1) is set while n is still a candidate.
+# The 81 masks live in one flat uint16 array, cell (i, j) is at i * 9 + j,
+# so copying a whole state is a single memcpy.
+#################################################
+
+all_candidates = 0x1FF
+
+# lookup tables for every possible mask
+popcount_table = [bin(mask).count("1") for mask in range(512)]
+digits_table = [tuple(n for n in range(1, 10) if mask >> (n - 1) & 1)
+                for mask in range(512)]
+
+
+# mask with only number n set
+def bit(n):
+    return 1 << (n - 1)
+
+
+# mask with all the given numbers set
+def to_mask(numbers):
+    mask = 0
+    for n in numbers:
+        mask |= 1 << (n - 1)
+    return mask
+
+
+# number of candidates in a mask
+def popcount(mask):
+    return popcount_table[mask]
+
+
+# lowest set bit of a mask (0 for an empty mask)
+def lowest_bit(mask):
+    return mask & -mask
+
+
+# smallest candidate in a mask (0 for an empty mask)
+def lowest_digit(mask):
+    return (mask & -mask).bit_length()
+
+
+# candidates of a mask as a tuple of numbers
+def digits(mask):
+    return digits_table[mask]
+
+
+class CandidateGrid:
+    """Candidate masks of all 81 cells in a flat uint16 array."""
+
+    __slots__ = ("cells",)
+
+    def __init__(self, cells=None):
+        if cells is None:
+            self.cells = array.array("H", [all_candidates] * 81)
+        else:
+            self.cells = array.array("H", cells)
+
+    @classmethod
+    def from_puzzle(cls, puzzle):
+        """Build a grid from a 9x9 array of numbers, 0 is an empty cell."""
+        grid = cls()
+        cells = grid.cells
+        for k, n in enumerate(np.asarray(puzzle, dtype=int).ravel()):
+            if n != 0:
+                cells[k] = 1 << (n - 1)
+        return grid
+
+    def copy(self):
+        grid = CandidateGrid.__new__(CandidateGrid)
+        grid.cells = self.cells[:]
+        return grid
+
+    def __getitem__(self, k):
+        return self.cells[k]
+
+    def __setitem__(self, k, mask):
+        self.cells[k] = mask
+
+    def __eq__(self, other):
+        return isinstance(other, CandidateGrid) and self.cells == other.cells
+
+    def __len__(self):
+        return 81
+
+    # candidates of cell k as a tuple of numbers
+    def candidates(self, k):
+        return digits_table[self.cells[k]]
+
+    # number of candidates left in cell k
+    def count(self, k):
+        return popcount_table[self.cells[k]]
+
+    # number in cell k if it is solved, 0 otherwise
+    def value(self, k):
+        mask = self.cells[k]
+        if popcount_table[mask] == 1:
+            return mask.bit_length()
+        return 0
+
+    # remove number n from cell k, returns 1 if it was there
+    def remove(self, k, n):
+        mask = self.cells[k]
+        if mask >> (n - 1) & 1:
+            self.cells[k] = mask & ~(1 << (n - 1))
+            return 1
+        return 0
+
+    def n_solved(self):
+        return sum(popcount_table[mask] == 1 for mask in self.cells)
+
+    def n_to_remove(self):
+        return sum(popcount_table[mask] for mask in self.cells) - 81
+
+    def to_array(self):
+        """Solved numbers as a 9x9 int array, 0 for unsolved cells."""
+        return np.array([self.value(k) for k in range(81)],
+                        dtype=int).reshape(9, 9)
+
+    def as_numpy(self):
+        """Zero-copy uint16 view of the masks."""
+        return np.frombuffer(self.cells, dtype=np.uint16)
@@ -0,0 +1,231 @@
+from candidategrid import popcount_table
+
+# Algorithm X with Dancing Links
+# Sudoku as exact cover: 729 rows (cell, number), 324 columns
+#   0..80     cell k has a number
+#   81..161   "column" i = k // 9 has number n
+#   162..242  "row" j = k % 9 has number n
+#   243..323  block of k has number n
+# The linked matrix is built once and shared by every puzzle: a puzzle hides
+# the rows of its eliminated candidates and selects its solved cells, and
+# all of that is undone again before the call returns.
+#################################################
+
+
+def _columns_of(k, n):
+    i, j = k // 9, k % 9
+    b = (i // 3) * 3 + j // 3
+    return (k, 81 + i * 9 + n - 1, 162 + j * 9 + n - 1, 243 + b * 9 + n - 1)
+
+
+class DancingLinks:
+    """The Sudoku exact cover matrix as a torus of doubly linked nodes.
+
+    Node 0 is the root, nodes 1..324 are the column headers, and row
+    r = k * 9 + n - 1 owns the four nodes 325 + 4 * r .. 328 + 4 * r.
+    """
+
+    def __init__(self):
+        n_nodes = 1 + 324 + 729 * 4
+        self.L = list(range(-1, n_nodes - 1))
+        self.R = list(range(1, n_nodes + 1))
+        self.U = list(range(n_nodes))
+        self.D = list(range(n_nodes))
+        self.C = list(range(n_nodes))
+        self.row = [-1] * n_nodes
+        self.size = [0] * 325
+
+        # root and headers in one horizontal ring
+        self.L[0] = 324
+        self.R[324] = 0
+
+        L, R, U, D, C = self.L, self.R, self.U, self.D, self.C
+        for r in range(729):
+            first = 325 + 4 * r
+            for x, col in enumerate(_columns_of(r // 9, r % 9 + 1)):
+                node = first + x
+                header = col + 1
+                C[node] = header
+                self.row[node] = r
+                # append at the bottom of the column
+                U[node] = U[header]
+                D[node] = header
+                D[U[header]] = node
+                U[header] = node
+                self.size[header] += 1
+                # ring of the four nodes of the row
+                L[node] = first + (x - 1) % 4
+                R[node] = first + (x + 1) % 4
+
+    def cover(self, c):
+        L, R, U, D, C, size = self.L, self.R, self.U, self.D, self.C, self.size
+        L[R[c]] = L[c]
+        R[L[c]] = R[c]
+        i = D[c]
+        while i != c:
+            j = R[i]
+            while j != i:
+                U[D[j]] = U[j]
+                D[U[j]] = D[j]
+                size[C[j]] -= 1
+                j = R[j]
+            i = D[i]
+
+    def uncover(self, c):
+        L, R, U, D, C, size = self.L, self.R, self.U, self.D, self.C, self.size
+        i = U[c]
+        while i != c:
+            j = L[i]
+            while j != i:
+                size[C[j]] += 1
+                U[D[j]] = j
+                D[U[j]] = j
+                j = L[j]
+            i = U[i]
+        L[R[c]] = c
+        R[L[c]] = c
+
+    # take a row out of all of its columns (an eliminated candidate)
+    def hide_row(self, r):
+        U, D, C, size = self.U, self.D, self.C, self.size
+        first = 325 + 4 * r
+        for j in range(first, first + 4):
+            U[D[j]] = U[j]
+            D[U[j]] = D[j]
+            size[C[j]] -= 1
+
+    def unhide_row(self, r):
+        U, D, C, size = self.U, self.D, self.C, self.size
+        first = 325 + 4 * r
+        for j in range(first + 3, first - 1, -1):
+            size[C[j]] += 1
+            U[D[j]] = j
+            D[U[j]] = j
+
+    # select a row: cover all of its columns, False if one is already gone
+    def select_row(self, r, covered):
+        first = 325 + 4 * r
+        for j in range(first, first + 4):
+            if covered[self.C[j]]:
+                return False
+        for j in range(first, first + 4):
+            covered[self.C[j]] = True
+            self.cover(self.C[j])
+        return True
+
+    def unselect_row(self, r, covered):
+        first = 325 + 4 * r
+        for j in range(first + 3, first - 1, -1):
+            covered[self.C[j]] = False
+            self.uncover(self.C[j])
+
+    def search(self, limit, stats):
+        """Lists of selected rows for up to limit exact covers."""
+        L, R, D, C, size, row = self.L, self.R, self.D, self.C, self.size, \
+            self.row
+        solutions = []
+        chosen = []
+
+        def step():
+            stats["nodes"] += 1
+            if R[0] == 0:
+                solutions.append(list(chosen))
+                return len(solutions) >= limit
+
+            # column with the fewest rows left
+            c = R[0]
+            best = c
+            while c != 0:
+                if size[c] < size[best]:
+                    best = c
+                    if size[c] < 2:
+                        break
+                c = R[c]
+            if size[best] == 0:
+                return False
+
+            self.cover(best)
+            r = D[best]
+            while r != best:
+                chosen.append(row[r])
+                j = R[r]
+                while j != r:
+                    self.cover(C[j])
+                    j = R[j]
+                done = step()
+                j = L[r]
+                while j != r:
+                    self.uncover(C[j])
+                    j = L[j]
+                chosen.pop()
+                if done:
+                    self.uncover(best)
+                    return True
+                stats["backtracks"] += 1
+                r = D[r]
+            self.uncover(best)
+            return False
+
+        step()
+        return solutions
+
+
+_links = None
+
+
+# the shared matrix, built on first use
+def sudoku_links():
+    global _links
+    if _links is None:
+        _links = DancingLinks()
+    return _links
+
+
+def dlx_search(grid, limit=1):
+    """Find up to limit solutions of a CandidateGrid with Dancing Links.
+
+    Returns (solutions, stats) like search.search(): solved CandidateGrid
+    copies, and the number of nodes visited and of rows taken back.
+    """
+    global _links
+    links = sudoku_links()
+    cells = grid.cells
+    stats = {"nodes": 0, "backtracks": 0}
+    covered = [False] * 325
+    hidden = []
+    selected = []
+    solutions = []
+    try:
+        for k in range(81):
+            mask = cells[k]
+            for n in range(9):
+                if not mask >> n & 1:
+                    links.hide_row(k * 9 + n)
+                    hidden.append(k * 9 + n)
+
+        broken = False
+        for k in range(81):
+            if popcount_table[cells[k]] == 1:
+                r = k * 9 + cells[k].bit_length() - 1
+                if not links.select_row(r, covered):
+                    broken = True
+                    break
+                selected.append(r)
+
+        if not broken:
+            for rows in links.search(limit, stats):
+                solution = grid.copy()
+                for r in rows:
+                    solution.cells[r // 9] = 1 << (r % 9)
+                solutions.append(solution)
+    except BaseException:
+        # interrupted half way (even Ctrl-C): the shared matrix may be left
+        # in any state, so the next call builds a new one
+        _links = None
+        raise
+
+    for r in reversed(selected):
+        links.unselect_row(r, covered)
+    for r in reversed(hidden):
+        links.unhide_row(r)
+    return solutions, stats
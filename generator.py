@@ -0,0 +1,176 @@
+import argparse
+import sys
+import time
+from collections import deque, namedtuple
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from candidategrid import CandidateGrid
+from helperfunctions import format_solutions
+from scheduler import FixedOrder
+from search import search
+from strategies import solve
+from validation import count_solutions
+
+# Puzzle generator
+# A random complete grid is made by filling the three blocks on the diagonal
+# (which do not see each other) with random permutations and completing the
+# rest with the search. Clues are then taken out in random order; a removal
+# is kept only if the puzzle stays within the target tier:
+#   - Easy and Medium: solve() still finishes it with the tier's strategies
+#     alone, no backtracking, which also proves the solution unique
+#   - Difficult: count_solutions() still finds a single solution
+# Every puzzle is finally rated by the strategies the full cascade in
+# solve() needed, and only those of the target tier are kept.
+#
+# Work is split into seeded tasks of `batch` puzzles that run in a process
+# pool; results stream back in task order, so a seed always gives the same
+# puzzles whatever the number of workers.
+#################################################
+
+tiers = ("Easy", "Medium", "Difficult")
+
+# the logic steps (report indices, see scheduler.py) each tier may need
+tier_steps = {
+    "Easy": (),
+    "Medium": (2, 3),
+}
+
+# puzzle and solution: (81,) uint8, 0 for empty cells in the puzzle
+# report: candidates removed by each of the 7 methods when rating it
+GeneratedPuzzle = namedtuple("GeneratedPuzzle",
+                             ["puzzle", "solution", "clues", "tier", "report"])
+
+
+def tier_of(report):
+    """Tier of a solve() report, by the hardest strategy it needed."""
+    if any(report[4:]):
+        return "Difficult"
+    if any(report[2:4]):
+        return "Medium"
+    return "Easy"
+
+
+def random_grid(rng):
+    """A random complete grid as (81,) uint8."""
+    g = np.zeros((9, 9), dtype=np.uint8)
+    for b in range(3):
+        g[3 * b:3 * b + 3, 3 * b:3 * b + 3] = \
+            (rng.permutation(9) + 1).reshape(3, 3)
+    grid = CandidateGrid.from_puzzle(g)
+    search(grid)
+    return grid.to_array().ravel().astype(np.uint8)
+
+
+# whether a puzzle is still unique and no harder than the tier
+def _within(puzzle, tier):
+    if tier not in tier_steps:
+        return count_solutions(puzzle) == 1
+    _, report = solve(puzzle.reshape(9, 9), False,
+                      scheduler=FixedOrder(tier_steps[tier]))
+    return report[6] == 0
+
+
+def make_puzzle(rng, tier="Difficult", min_clues=17):
+    """A puzzle made by removing clues from a random grid, rated.
+
+    Removal stops at min_clues. The result may be easier than tier.
+    """
+    solution = random_grid(rng)
+    puzzle = solution.copy()
+    clues = 81
+    for k in rng.permutation(81):
+        if clues <= min_clues:
+            break
+        puzzle[k] = 0
+        if _within(puzzle, tier):
+            clues -= 1
+        else:
+            puzzle[k] = solution[k]
+    _, report = solve(puzzle.reshape(9, 9), False)
+    return GeneratedPuzzle(puzzle, solution, clues, tier_of(report), report)
+
+
+def generate_task(seed, task, tier, batch, min_clues=17, max_attempts=None):
+    """batch puzzles of the tier from the random stream (seed, task).
+
+    Returns (puzzles, attempts): gives up after max_attempts candidates
+    (20 per puzzle by default) and returns what it has.
+    """
+    rng = np.random.default_rng([seed, task])
+    if max_attempts is None:
+        max_attempts = 20 * batch
+    found = []
+    attempts = 0
+    while len(found) < batch and attempts < max_attempts:
+        attempts += 1
+        candidate = make_puzzle(rng, tier, min_clues)
+        if candidate.tier == tier:
+            found.append(candidate)
+    return found, attempts
+
+
+def generate(count, tier="Medium", workers=1, seed=0, batch=10, min_clues=17):
+    """Yield count GeneratedPuzzles of the tier, as soon as they are ready."""
+    if tier not in tiers:
+        raise ValueError("Unknown tier %r, expected one of %s" %
+                         (tier, ", ".join(tiers)))
+    tasks = iter(range(sys.maxsize))
+    made = 0
+    if workers <= 1:
+        for task in tasks:
+            puzzles, _ = generate_task(seed, task, tier, batch, min_clues)
+            for p in puzzles[:count - made]:
+                yield p
+            made += len(puzzles)
+            if made >= count:
+                return
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        pending = deque()
+        while made < count:
+            while len(pending) < workers * 2:
+                pending.append(executor.submit(generate_task, seed, next(tasks),
+                                               tier, batch, min_clues))
+            puzzles, _ = pending.popleft().result()
+            for p in puzzles[:count - made]:
+                yield p
+            made += len(puzzles)
+        for future in pending:
+            future.cancel()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate rated Sudoku puzzles.")
+    parser.add_argument("count", type=int)
+    parser.add_argument("--tier", default="Medium", choices=tiers)
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--batch", type=int, default=10,
+                        help="puzzles per task of a worker")
+    parser.add_argument("--min-clues", type=int, default=17)
+    parser.add_argument("--output", help="CSV file, standard output by default")
+    args = parser.parse_args(argv)
+
+    out = open(args.output, "w") if args.output else sys.stdout
+    start = time.perf_counter()
+    try:
+        out.write("id,puzzle,solution,clues,tier\n")
+        for i, p in enumerate(generate(args.count, args.tier, args.workers,
+                                       args.seed, args.batch, args.min_clues)):
+            puzzle, solution = format_solutions(np.array([p.puzzle, p.solution]))
+            out.write("%d,%s,%s,%d,%s\n" % (i, puzzle.replace("0", "."),
+                                             solution, p.clues, p.tier))
+            out.flush()
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    elapsed = time.perf_counter() - start
+    print("%d puzzles in %.1fs, %.0f puzzles/hour" %
+          (args.count, elapsed, args.count / elapsed * 3600), file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
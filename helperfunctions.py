@@ -1,63 +1,65 @@
 import numpy as np
-import time
-from strategies import *
 
-# Some helper lists to iterate through houses
-#################################################
-
-# return columns' lists of cells
-all_columns = [[(i, j) for j in range(9)] for i in range(9)]
+from candidategrid import CandidateGrid
 
-# same for rows
-all_rows = [[(i, j) for i in range(9)] for j in range(9)]
+# Cells are flat indices into the candidate grid, cell (i, j) is i * 9 + j
+# (see indextables.py for the houses, peers and intersections)
 
-# same for blocks
-# this list comprehension is unreadable, but quite cool!
-all_blocks = [[((i//3) * 3 + j//3, (i % 3)*3+j % 3)
-               for j in range(9)] for i in range(9)]
 
-# combine three
-all_houses = all_columns+all_rows+all_blocks
+# Bulk parsing and formatting
+# Whole columns of puzzle strings at once: one join, one np.frombuffer.
+#################################################
+# a puzzle line as str, whether it came as str or bytes; any byte decodes,
+# so a line that is not a puzzle fails the character checks, not here
+def puzzle_text(line):
+    if isinstance(line, (bytes, bytearray)):
+        return line.decode("latin-1")
+    return line
+
+
+def parse_puzzles(puzzles):
+    """81-char puzzle strings -> (N, 81) uint8 array, 0 for empty cells.
+
+    puzzles is a list or pandas column of str or bytes lines, or a single
+    str/bytes buffer of puzzles joined back to back. Both '.' and '0' are
+    empty.
+    """
+    if isinstance(puzzles, str):
+        puzzles = puzzles.encode("ascii")
+    elif not isinstance(puzzles, (bytes, bytearray, memoryview)):
+        if not hasattr(puzzles, "__len__"):
+            puzzles = list(puzzles)
+        try:
+            text = "".join(puzzles)
+        except TypeError:  # bytes lines
+            text = "".join(map(puzzle_text, puzzles))
+        puzzles = text.encode("ascii")
+    raw = np.frombuffer(puzzles, dtype=np.uint8)
+    if raw.size % 81:
+        raise ValueError("puzzle strings must be 81 characters long")
+    digits = raw - np.uint8(ord("0"))
+    digits[raw == ord(".")] = 0
+    if digits.size and digits.max() > 9:
+        raise ValueError("puzzle strings may only hold digits and '.'")
+    return digits.reshape(-1, 81)
+
+
+def format_solutions(solutions):
+    """(N, 81) or (N, 9, 9) numbers -> list of 81-char strings."""
+    solutions = np.asarray(solutions).reshape(-1, 81)
+    text = (solutions.astype(np.uint8) + np.uint8(ord("0"))).tobytes()
+    text = text.decode("ascii")
+    return [text[i:i + 81] for i in range(0, len(text), 81)]
 
 
 # Some helper functions
 #################################################
-# returns list [(0,0), (0,1) .. (a-1,b-1)]
-# kind of like "range" but for 2d array
-def range2(a, b):
-    permutations = []
-    for j in range(b):
-        for i in range(a):
-            permutations.append((i, j))
-    return permutations
-
-
 # Adding candidates instead of zeros
+# (a grid that already has candidates is copied as it is)
 def pencil_in_numbers(puzzle):
-    sudoku = np.empty((9, 9), dtype=object)
-    for (j, i) in range2(9, 9):
-        if puzzle[i, j] != 0:
-            sudoku[i][j] = [puzzle[i, j], ]
-        else:
-            sudoku[i][j] = [i for i in range(1, 10)]
-    return sudoku
-
-
-# Count solved cells
-def n_solved(sudoku):
-    solved = 0
-    for (i, j) in range2(9, 9):
-        if len(sudoku[i, j]) == 1:
-            solved += 1
-    return solved
-
-
-# Count remaining unsolved candidates to remove
-def n_to_remove(sudoku):
-    to_remove = 0
-    for (i, j) in range2(9, 9):
-        to_remove += len(sudoku[i, j])-1
-    return to_remove
+    if isinstance(puzzle, CandidateGrid):
+        return puzzle.copy()
+    return CandidateGrid.from_puzzle(puzzle)
 
 
 # Print full sudoku, with all candidates (rather messy)
@@ -66,14 +68,15 @@ def print_sudoku(sudoku):
         out_string = "|"
         out_string2 = " " * 10 + "|"
         for i in range(9):
-            if len(sudoku[i, j]) == 1:
-                out_string2 += str(sudoku[i, j][0])+" "
+            numbers = sudoku.candidates(i * 9 + j)
+            if len(numbers) == 1:
+                out_string2 += str(numbers[0])+" "
             else:
                 out_string2 += "  "
 
-            for k in range(len(sudoku[i, j])):
-                out_string += str(sudoku[i, j][k])
-            for k in range(10 - len(sudoku[i, j])):
+            for k in range(len(numbers)):
+                out_string += str(numbers[k])
+            for k in range(10 - len(numbers)):
                 out_string += " "
             if (i + 1) % 3 == 0:
                 out_string += " | "
@@ -0,0 +1,48 @@
+# Precomputed index tables, built once at import
+# Cells are flat indices into the candidate grid, cell (i, j) is i * 9 + j.
+# Houses are numbered 0-26:
+# 0-8 are the "columns" (fixed i), 9-17 the "rows" (fixed j), 18-26 the blocks
+#################################################
+
+# cells of every house
+cells_of_house = tuple(
+    [tuple(i * 9 + j for j in range(9)) for i in range(9)] +
+    [tuple(i * 9 + j for i in range(9)) for j in range(9)] +
+    [tuple(((b // 3) * 3 + k // 3) * 9 + (b % 3) * 3 + k % 3
+           for k in range(9)) for b in range(9)])
+
+column_houses = range(0, 9)
+row_houses = range(9, 18)
+block_houses = range(18, 27)
+
+# the three houses every cell belongs to (column, row, block)
+houses_of_cell = tuple(
+    tuple(h for h in range(27) if k in cells_of_house[h]) for k in range(81))
+
+# the 20 cells every cell can see
+peers_of_cell = tuple(
+    tuple(sorted(set(c for h in houses_of_cell[k] for c in cells_of_house[h])
+                 - {k}))
+    for k in range(81))
+
+# for every (block, line) pair: (both, only_block, only_line) cell tuples,
+# or None if the block and the line do not intersect.
+# Lines are indexed like row_houses + column_houses (rows first).
+def _block_line_region(block, line):
+    sblock = set(cells_of_house[block])
+    sline = set(cells_of_house[line])
+    both = sblock & sline
+    if not both:
+        return None
+    return (tuple(sorted(both)), tuple(sorted(sblock - both)),
+            tuple(sorted(sline - both)))
+
+
+block_line_regions = tuple(
+    tuple(_block_line_region(block, line)
+          for line in list(row_houses) + list(column_houses))
+    for block in block_houses)
+
+# the 54 block/line pairs that intersect, as (both, only_block, only_line)
+intersection_triples = tuple(region for regions in block_line_regions
+                             for region in regions if region is not None)
@@ -0,0 +1,84 @@
+# Per-strategy instrumentation
+# For each of the seven methods: how often it ran, how often it removed
+# something, how long it took in total (perf_counter_ns) and how many
+# candidates it removed. Recording is a few integer additions per call,
+# so it stays on all the time.
+#################################################
+
+strategy_names = [
+    'Simple elimination',
+    'Hidden single',
+    'CSP',
+    'Intersection',
+    'Fish',
+    '3D Medusa',
+    'Backtracking']
+
+
+class StrategyStats:
+    """Counters for the seven strategies, indexed like the report."""
+
+    __slots__ = ("calls", "productive", "time_ns", "removed",
+                 "search_nodes", "search_backtracks")
+
+    def __init__(self):
+        self.calls = [0] * 7
+        self.productive = [0] * 7
+        self.time_ns = [0] * 7
+        self.removed = [0] * 7
+        # what the backtracking had to do
+        self.search_nodes = 0
+        self.search_backtracks = 0
+
+    def record(self, i, removed, elapsed_ns, calls=1, productive=None):
+        self.calls[i] += calls
+        if productive is None:
+            productive = 1 if removed > 0 else 0
+        self.productive[i] += productive
+        self.time_ns[i] += elapsed_ns
+        self.removed[i] += removed
+
+    def merge(self, other):
+        """Add another puzzle's (or worker's) counters to these."""
+        for i in range(7):
+            self.calls[i] += other.calls[i]
+            self.productive[i] += other.productive[i]
+            self.time_ns[i] += other.time_ns[i]
+            self.removed[i] += other.removed[i]
+        self.search_nodes += other.search_nodes
+        self.search_backtracks += other.search_backtracks
+        return self
+
+    def as_dict(self):
+        out = {}
+        for i, name in enumerate(strategy_names):
+            out[name] = {
+                "calls": self.calls[i],
+                "productive": self.productive[i],
+                "time_ns": self.time_ns[i],
+                "removed": self.removed[i],
+            }
+        out["Backtracking"]["nodes"] = self.search_nodes
+        out["Backtracking"]["backtracks"] = self.search_backtracks
+        return out
+
+    @classmethod
+    def from_dict(cls, d):
+        """The counters of an as_dict() result, e.g. read back from JSON."""
+        stats = cls()
+        for i, name in enumerate(strategy_names):
+            stats.calls[i] = d[name]["calls"]
+            stats.productive[i] = d[name]["productive"]
+            stats.time_ns[i] = d[name]["time_ns"]
+            stats.removed[i] = d[name]["removed"]
+        stats.search_nodes = d["Backtracking"]["nodes"]
+        stats.search_backtracks = d["Backtracking"]["backtracks"]
+        return stats
+
+    def print_table(self):
+        print("%-20s %8s %11s %12s %9s" %
+              ("Strategy", "Calls", "Productive", "Time (ms)", "Removed"))
+        for i, name in enumerate(strategy_names):
+            print("%-20s %8d %11d %12.3f %9d" %
+                  (name, self.calls[i], self.productive[i],
+                   self.time_ns[i] / 1e6, self.removed[i]))
@@ -1,16 +1,51 @@
-from strategies import *
-from helperfunctions import *
-from plottingfunctions import *
+from strategies import solve, solve_from_line
+from helperfunctions import format_solutions, parse_puzzles
+from plottingfunctions import plot_strategy_count, plot_time_difficulty
+from batchsolver import solve_batch
+from instrumentation import StrategyStats
+from resultsink import ResultSink
+from runstats import RunStats
+from solverapi import is_solution
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import chain, islice
 import numpy as np
-import pandas as pd
 import time
-import matplotlib.pyplot as plt
 
-def load_and_prepare_data(filename):
-    """Load and prepare the puzzle data from CSV."""
-    df = pd.read_csv(filename)
-    df['puzzle'] = df['puzzle'].apply(lambda x: x.replace('.', '0'))
-    df['difficulty'] = df['difficulty'].apply(categorize_difficulty)
+# pandas (and matplotlib, in plottingfunctions.py) are imported where they
+# are used, so worker processes and library users do not pay for them
+
+def load_and_prepare_data(filename, start=0, limit=None, columns=None):
+    """Load and prepare the puzzle data from CSV.
+
+    Only the rows from start to start + limit (all rows by default) and the
+    given columns (all by default) are read.
+    """
+    import pandas as pd
+    chunks = list(iter_puzzle_chunks(filename, start, limit, columns))
+    if not chunks:
+        return pd.DataFrame(columns=columns)
+    return pd.concat(chunks, ignore_index=True)
+
+def iter_puzzle_chunks(filename, start=0, limit=None, columns=None, chunk_size=100000):
+    """Read the puzzle CSV lazily, yielding prepared DataFrames of chunk_size rows.
+
+    Rows before start are skipped, at most limit rows are read, and only the
+    given columns are parsed. Normalisation is vectorized per chunk.
+    """
+    import pandas as pd
+    reader = pd.read_csv(filename, usecols=columns,
+                         skiprows=range(1, start + 1) if start else None,
+                         nrows=limit, chunksize=chunk_size)
+    for chunk in reader:
+        yield prepare_chunk(chunk)
+
+def prepare_chunk(df):
+    """Replace '.' with '0' in puzzles and map ratings to difficulty tiers."""
+    if 'puzzle' in df:
+        df['puzzle'] = df['puzzle'].str.replace('.', '0', regex=False)
+    if 'difficulty' in df:
+        df['difficulty'] = categorize_difficulties(df['difficulty'])
     return df
 
 def categorize_difficulty(x):
@@ -21,75 +56,242 @@ def categorize_difficulty(x):
         return "Medium"
     else:
         return "Difficult"
+
+def categorize_difficulties(ratings):
+    """Vectorized categorize_difficulty for a whole column of ratings."""
+    ratings = np.asarray(ratings, dtype=float)
+    return np.where(ratings < 2.8, "Easy",
+                    np.where(ratings < 5.7, "Medium", "Difficult")).astype(object)
     
 def calculate_entropy(puzzle):
-    """Calculate the entropy of a Sudoku puzzle based on the count of possible numbers per cell."""
-    entropy = 0
-    for cell in puzzle:
-        if cell == '0':  
-            entropy += 1  # Simple measure of entropy: more unfilled cells, higher the entropy
-    return entropy
-
-def solve_puzzles(df, n):
-    """Solve n puzzles and record times, complexities, and strategy usage."""
-    time_data = {'Easy': [], 'Medium': [], 'Difficult': []}
-    complexity_data = []
-    strategy_efficiency_data = []
-
-    if n > len(df):
-        print("Insufficient puzzles available. Solving available puzzles only.")
-        n = len(df)
-
-    df_subset = df.head(n)
-    for index, row in df_subset.iterrows():
-        puzzle_name = f"Puzzle {row['id']} ({row['difficulty']})"
+    """Simple entropy of a puzzle line: its number of unfilled cells.
+
+    See puzzlemetrics.py for candidate-based scores of many puzzles at once.
+    """
+    return puzzle.count('0')
+
+def solve_puzzles(df, n, batch=False, workers=1, chunk_size=None, stats=None,
+                  sink=None):
+    """Solve n puzzles and record times, complexities, and strategy usage.
+
+    df is a DataFrame or an iterable of DataFrame chunks such as
+    iter_puzzle_chunks() yields, so a run never has to hold all puzzles.
+    With batch=True the singles run on all puzzles of a chunk at once (see
+    batchsolver.py) and only the rest goes through the strategies one by one.
+    With workers > 1 the puzzles are split into chunks of chunk_size
+    (by default about four chunks per worker) and solved by that many
+    processes.
+    Per-strategy calls and times are added to stats, a StrategyStats, if given.
+    With sink, a ResultSink, every result is written to it as it comes, and
+    the puzzles it already has are not solved again: their stored results
+    go into the RunStats and their stored strategy counters into stats
+    instead. ValueError if the sink's last puzzle is not where it should be
+    in df, i.e. the results are of other puzzles. Once all puzzles are done
+    the sink is marked finished, so the next run on it starts over.
+    Returns a RunStats with the solving times per difficulty and the
+    summed strategy usage.
+    """
+    if hasattr(df, "itertuples"):  # a single DataFrame
+        if n > len(df):
+            print("Insufficient puzzles available. Solving available puzzles only.")
+            n = len(df)
+        df = [df]
+    rows = islice((row for chunk in df for row in chunk.itertuples()), n)
+    run_stats = RunStats()
+    if sink is not None and sink.done:
+        skipped = 0
+        last = None
+        for last in islice(rows, sink.done):
+            skipped += 1
+        if skipped < sink.done:
+            raise ValueError("%s already has %d results, more than the %d "
+                             "puzzles of this run" % (sink.path, sink.done, n))
+        if str(last.id) != sink.last_id:
+            raise ValueError("The results in %s end with puzzle %s, but puzzle "
+                             "%d of this input is %s" %
+                             (sink.path, sink.last_id, sink.done, last.id))
+        for result in sink.results():
+            run_stats.add(result.difficulty, result.elapsed, result.report,
+                          solved=result.status == "solved")
+        if stats is not None:
+            stats.merge(sink.stats)
+        n = max(0, n - sink.done)
+
+    if batch or workers > 1:
+        if chunk_size is None:
+            chunk_size = max(1, -(-n // (workers * 4)))
+        solve_puzzles_chunked(rows, batch, workers, chunk_size, stats,
+                              run_stats, sink)
+        if sink is not None:
+            sink.finish()
+        return run_stats
+
+    for row in rows:
+        puzzle_name = f"Puzzle {row.id} ({row.difficulty})"
         print(f"\n{puzzle_name}")
-        print(row['puzzle'])
+        print(row.puzzle)
 
+        puzzle_stats = StrategyStats()
         start_time = time.time()
-        solution, report_list = solve_from_line(row['puzzle'], verbose=True)
+        solution, report = solve_from_line(row.puzzle, verbose=True, stats=puzzle_stats)
         elapsed_time = time.time() - start_time
+        if stats is not None:
+            stats.merge(puzzle_stats)
 
-        time_data[row['difficulty']].append(elapsed_time)
-        complexity_data.append(calculate_entropy(row['puzzle']))  # Calculate and collect entropy
-        strategy_efficiency_data.append(report_list)
+        solved = is_solution(solution)
+        run_stats.add(row.difficulty, elapsed_time, report,
+                      calculate_entropy(row.puzzle), solved)
+        if sink is not None:
+            sink.add(row.id, row.difficulty, format_solutions(solution)[0],
+                     "solved" if solved else "broken", report, elapsed_time,
+                     puzzle_stats)
 
         print("Time taken: {:.2f}s".format(elapsed_time))
-        print("Report List:", report_list)
+        print("Report List:", report)
         print("=" * 45)
 
-    # Convert time_data to a single list of times corresponding to each puzzle
-    total_times = [time for sublist in time_data.values() for time in sublist]
-    
-    return time_data, report_list, complexity_data, strategy_efficiency_data, total_times
+    if sink is not None:
+        sink.finish()
+    return run_stats
+
+def solve_chunk(lines, batch=False):
+    """Solve a list of puzzle lines without printing.
+
+    Returns a list of (solution, solved, report, elapsed time), one per
+    puzzle, solution being an 81-char string, and the StrategyStats of the
+    whole chunk. This is what the worker processes run in parallel mode.
+    """
+    stats = StrategyStats()
+    puzzles = parse_puzzles(lines)
+    if batch:
+        solutions, reports, times = solve_batch(puzzles, stats=stats)
+    else:
+        solutions = np.zeros(puzzles.shape, dtype=np.uint8)
+        reports = []
+        times = []
+        for i, puzzle in enumerate(puzzles):
+            report = [0] * 7
+            start_time = time.time()
+            grid, _ = solve(puzzle.reshape(9, 9), False, report=report, stats=stats)
+            times.append(time.time() - start_time)
+            solutions[i] = grid.to_array().ravel()
+            reports.append(report)
+    solved = [is_solution(solution) for solution in solutions]
+    return list(zip(format_solutions(solutions), solved, reports, times)), stats
+
+def solve_chunks_in_order(executor, chunks, batch, window):
+    """(chunk, solve_chunk result) pairs in order, at most window chunks in flight."""
+    pending = deque()
+    for chunk in chunks:
+        lines = [row.puzzle for row in chunk]
+        pending.append((chunk, executor.submit(solve_chunk, lines, batch)))
+        if len(pending) >= window:
+            chunk, future = pending.popleft()
+            yield chunk, future.result()
+    while pending:
+        chunk, future = pending.popleft()
+        yield chunk, future.result()
+
+def solve_puzzles_chunked(rows, batch, workers, chunk_size, stats=None, run_stats=None,
+                          sink=None):
+    """Chunked version of solve_puzzles for an iterator of rows.
+
+    Chunks go to a pool of worker processes when workers > 1; results come
+    back and are printed (and written to sink, if given) in the original
+    puzzle order either way. Only a few chunks per worker are read ahead.
+    """
+    if run_stats is None:
+        run_stats = RunStats()
+
+    def chunks():
+        while True:
+            chunk = list(islice(rows, chunk_size))
+            if not chunk:
+                return
+            yield chunk
+
+    executor = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+    finished = False
+    try:
+        if executor is not None:
+            results = solve_chunks_in_order(executor, chunks(), batch, workers * 2)
+        else:
+            results = ((chunk, solve_chunk([row.puzzle for row in chunk], batch))
+                       for chunk in chunks())
+
+        for chunk, (chunk_results, chunk_stats) in results:
+            if stats is not None:
+                stats.merge(chunk_stats)
+            for k, (row, (solution, solved, report, elapsed_time)) in \
+                    enumerate(zip(chunk, chunk_results)):
+                print(f"\nPuzzle {row.id} ({row.difficulty})")
+                print(row.puzzle)
+                run_stats.add(row.difficulty, elapsed_time, report,
+                              calculate_entropy(row.puzzle), solved)
+                if sink is not None:
+                    # the chunk's counters go with its last puzzle
+                    sink.add(row.id, row.difficulty, solution,
+                             "solved" if solved else "broken", report, elapsed_time,
+                             chunk_stats if k == len(chunk) - 1 else None)
+                print("Time taken: {:.2f}s".format(elapsed_time))
+                print("Report:", report)
+                print("=" * 45)
+        finished = True
+    finally:
+        if executor is not None:
+            # leaving on an error or Ctrl-C: drop the chunks still queued
+            # instead of waiting for results nobody will write
+            executor.shutdown(cancel_futures=not finished)
+
+    return run_stats
 
 def main():
     filename = "sudoku-3m.csv"
+    results_file = "results.csv"
     print("Sudoku Solver Demo")
-    print("Preparing the data")
-    df = load_and_prepare_data(filename)
-    print(df.head())
-
     print("Please Enter the number of puzzles to solve: ")
     n = int(input().strip())
-    time_data, report_list, complexity_data, strategy_efficiency_data, total_times = solve_puzzles(df, n)
+    print("Preparing the data")
+    chunks = iter_puzzle_chunks(filename, limit=n, columns=['id', 'puzzle', 'difficulty'])
+    first = next(chunks, None)
+    if first is None:
+        print("No puzzles found.")
+        return
+    print(first.head())
+
+    print("Number of worker processes (press Enter for 1): ")
+    workers = input().strip()
+    workers = int(workers) if workers else 1
+    stats = StrategyStats()
+    try:
+        with ResultSink(results_file, source=filename) as sink:
+            if sink.done:
+                print("Resuming after the %d puzzles in %s (delete it to start over)"
+                      % (sink.done, results_file))
+            run_stats = solve_puzzles(chain([first], chunks), n, workers=workers,
+                                      stats=stats, sink=sink)
+    except ValueError as e:
+        print(e)
+        return
+    n = run_stats.count
+    print("\nSolving times:")
+    run_stats.print_summary()
+    print("\nStrategy usage over all puzzles:")
+    stats.print_table()
 
     # Before plotting, check if the data lengths match
     # print("Length of complexity data:", len(complexity_data))
     # print("Length of total times data:", len(total_times))
     # Graph1
     # Plotting usage count of strategies
-    plot_strategy_count(report_list,n)
+    plot_strategy_count(run_stats,n)
 
 
 
     # Graph2
     # Plotting a bar graph of average times by difficulty
     # We take the average time for each difficulty level for a simple bar graph
-    average_times = {key: np.mean(val) if val else 0 for key, val in time_data.items()}
-    difficulties = list(average_times.keys())
-    times = list(average_times.values())
-    plot_time_difficulty(difficulties, times,n)
+    plot_time_difficulty(run_stats, n=n)
     
     
     
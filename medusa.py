@@ -0,0 +1,156 @@
+from collections import deque
+
+from candidategrid import digits_table, popcount_table
+from indextables import cells_of_house, houses_of_cell
+
+# 3D Medusa
+# Nodes are candidates (cell k, number n), numbered k * 9 + n - 1. Two nodes
+# are strongly linked when exactly one of them is true: the only two places
+# of a number in a house, or the only two numbers of a cell. Every connected
+# group of links is coloured in two colours with a BFS, and exactly one
+# colour of a group is true. Then:
+#   - a colour is false if it is twice in a cell, if a number has it twice
+#     in a house, or if it would leave a cell with no number at all
+#     (all of the colour's candidates are removed)
+#   - a candidate that is false whichever colour is true is removed; that
+#     covers two colours in a cell, two colours elsewhere and a colour in
+#     the cell with the other one in sight
+# The graph is built once per call; colours are indexed by cell and by
+# (house, number), so no rule scans the chains.
+#################################################
+
+
+def strong_links(cells):
+    """Adjacency lists {node: [nodes]} of the strong links of the grid."""
+    links = {}
+
+    def link(x, y):
+        links.setdefault(x, []).append(y)
+        links.setdefault(y, []).append(x)
+
+    for house in cells_of_house:
+        places = [[] for _ in range(10)]
+        for k in house:
+            for n in digits_table[cells[k]]:
+                places[n].append(k)
+        for n in range(1, 10):
+            pair = places[n]
+            if len(pair) == 2 and popcount_table[cells[pair[0]]] > 1 \
+                    and popcount_table[cells[pair[1]]] > 1:
+                link(pair[0] * 9 + n - 1, pair[1] * 9 + n - 1)
+    for k in range(81):
+        if popcount_table[cells[k]] == 2:
+            n1, n2 = digits_table[cells[k]]
+            link(k * 9 + n1 - 1, k * 9 + n2 - 1)
+    return links
+
+
+def color_groups(links):
+    """[{node: colour 0 or 1}] per connected group, None if it has an odd cycle."""
+    seen = set()
+    groups = []
+    for start in sorted(links):
+        if start in seen:
+            continue
+        colors = {start: 0}
+        seen.add(start)
+        queue = deque([start])
+        consistent = True
+        while queue:
+            x = queue.popleft()
+            for y in links[x]:
+                if y not in colors:
+                    colors[y] = 1 - colors[x]
+                    seen.add(y)
+                    queue.append(y)
+                elif colors[y] == colors[x]:
+                    consistent = False
+        groups.append(colors if consistent else None)
+    return groups
+
+
+# index a group's colours: nodes per cell and counts per (house, number)
+def color_index(cells, colors):
+    in_cell = {}
+    in_house = ([0] * 243, [0] * 243)
+    for node, c in colors.items():
+        k, n = divmod(node, 9)
+        if not cells[k] >> n & 1:
+            continue  # removed since the links were found
+        in_cell.setdefault(k, []).append((n + 1, c))
+        for h in houses_of_cell[k]:
+            in_house[c][h * 9 + n] += 1
+    return in_cell, in_house
+
+
+def false_color(cells, in_cell, in_house):
+    """0 or 1 if that colour leads to a contradiction, otherwise None."""
+    for c in (0, 1):
+        # twice in a cell
+        for colored in in_cell.values():
+            if sum(1 for _, cc in colored if cc == c) > 1:
+                return c
+        # twice in a house
+        if max(in_house[c]) > 1:
+            return c
+    # a cell left without numbers
+    for c in (0, 1):
+        for k in range(81):
+            if popcount_table[cells[k]] > 1 and all(
+                    false_if(c, k, n, in_cell, in_house)
+                    for n in digits_table[cells[k]]):
+                return c
+    return None
+
+
+def false_if(c, k, n, in_cell, in_house):
+    """Whether candidate n of cell k is false when colour c is true."""
+    own = None
+    other_c = False
+    for m, cc in in_cell.get(k, ()):
+        if m == n:
+            own = cc
+        elif cc == c:
+            other_c = True
+    if own is not None:
+        return own != c
+    if other_c:
+        return True
+    # an uncoloured candidate that sees the number in colour c
+    for h in houses_of_cell[k]:
+        if in_house[c][h * 9 + n - 1]:
+            return True
+    return False
+
+
+def medusa_3d(s):
+    cells = s.cells
+    count = 0
+    for colors in color_groups(strong_links(cells)):
+        if colors is None:
+            continue  # odd cycle, the puzzle is broken
+        in_cell, in_house = color_index(cells, colors)
+
+        c = false_color(cells, in_cell, in_house)
+        if c is not None:
+            for node, cc in colors.items():
+                k, n = divmod(node, 9)
+                if cc == c and cells[k] >> n & 1:
+                    cells[k] &= ~(1 << n)
+                    count += 1
+            continue
+
+        # uncoloured candidates that are false either way
+        removed = []
+        for k in range(81):
+            if popcount_table[cells[k]] < 2:
+                continue
+            for n in digits_table[cells[k]]:
+                if (k * 9 + n - 1) not in colors \
+                        and false_if(0, k, n, in_cell, in_house) \
+                        and false_if(1, k, n, in_cell, in_house):
+                    removed.append((k, n))
+        for k, n in removed:
+            cells[k] &= ~(1 << (n - 1))
+            count += 1
+    return count
@@ -1,16 +1,20 @@
 import numpy as np
-import time
-from strategies import *
-from helperfunctions import *
-from mpl_toolkits.mplot3d import Axes3D
-from sklearn.preprocessing import StandardScaler
-import matplotlib.pyplot as plt # plotting
-import os # accessing directory structure
-import pandas as pd # data processing, CSV file I/O (e.g. pd.read_csv)
-import seaborn as sns
+from runstats import RunStats
 
+# matplotlib and seaborn take seconds to import, so they are only loaded
+# once a plot is actually made
+def _pyplot():
+    import matplotlib.pyplot as plt
+    return plt
 
-def plot_time_difficulty(difficulties, times,n):
+
+def plot_time_difficulty(difficulties, times=None, n=None):
+    # a RunStats aggregate can be passed instead, for its mean time per tier
+    if isinstance(difficulties, RunStats):
+        average_times = difficulties.mean_times()
+        difficulties = list(average_times.keys())
+        times = list(average_times.values())
+    plt = _pyplot()
     plt.figure(figsize=(10, 6))
     bars=plt.bar(difficulties, times, color=['green', 'orange', 'red'])
     plt.xlabel('Difficulty')
@@ -21,7 +25,11 @@ def plot_time_difficulty(difficulties, times,n):
     #plt.show()
 
 def plot_strategy_count(usage_data,n):
-    total_usage = np.sum(usage_data, axis=0)
+    # a list of per-puzzle reports, or a RunStats with the sums already made
+    if isinstance(usage_data, RunStats):
+        total_usage = usage_data.strategy_usage
+    else:
+        total_usage = np.sum(usage_data, axis=0)
 
     # Names of the strategies in the order they are applied
     strategy_names = [
@@ -29,12 +37,13 @@ def plot_strategy_count(usage_data,n):
         'Hidden Single',
         'CSP',
         'Intersection',
-        'X-Wing',
+        'Fish',
         '3D Medusa',
         'Backtracking'
     ]
 
     # Plotting
+    plt = _pyplot()
     plt.figure(figsize=(10, 6))
     bars=plt.bar(strategy_names, total_usage, color=['blue','red','green','purple','orange','yellow','brown'])
     plt.xlabel('Sudoku Solving Strategies')
@@ -48,6 +57,7 @@ def plot_strategy_count(usage_data,n):
 
 def plot_complexity_analysis(entropies, times):
     """Plot the entropy of puzzles against the time taken to solve them."""
+    plt = _pyplot()
     plt.figure(figsize=(10, 6))
     plt.scatter(entropies, times, alpha=0.7, edgecolors='w')
     plt.xlabel('Puzzle Entropy (Count of Empty Cells)')
@@ -62,9 +72,11 @@ def plot_strategy_efficiency(usage_data, times):
     # Assuming usage_data contains flat lists of strategy usage, not lists of lists.
     efficiency = [list(map(lambda x: x/t if t else 0, usage)) for usage, t in zip(usage_data, times)]
     
+    plt = _pyplot()
+    import seaborn as sns
     plt.figure(figsize=(12, 8))
     sns.heatmap(efficiency, annot=True, cmap='coolwarm', fmt=".2f",
-                xticklabels=['Simple Elimination', 'Hidden Single', 'CSP', 'Intersection', 'X-Wing', '3D Medusa', 'Backtracking'],
+                xticklabels=['Simple Elimination', 'Hidden Single', 'CSP', 'Intersection', 'Fish', '3D Medusa', 'Backtracking'],
                 yticklabels=['Puzzle {}'.format(i+1) for i in range(len(times))])
     plt.xlabel('Strategy')
     plt.ylabel('Puzzle')
@@ -0,0 +1,161 @@
+import array
+from collections import deque
+from time import perf_counter_ns
+
+from candidategrid import all_candidates, digits_table, popcount_table
+from indextables import cells_of_house, houses_of_cell, peers_of_cell
+
+# Event-driven singles
+# Instead of sweeping all 27 houses every round, the propagator keeps a queue
+# of cells whose candidates changed and only re-examines those cells and the
+# houses they are in. Solved cells and remaining candidates are counted as
+# cells change, so nobody has to rescan the grid for them.
+#################################################
+
+
+class Propagator:
+    """Naked and hidden singles driven by a queue of changed cells."""
+
+    def __init__(self, grid):
+        self.grid = grid
+        # masks as last processed, and as last counted in the counters;
+        # every cell starts with all nine candidates
+        self.known = array.array("H", [all_candidates] * 81)
+        self.counted = array.array("H", [all_candidates] * 81)
+        self.solved = 0
+        self.to_remove = 9 * 81 - 81
+        self.broken = False
+        self.cell_queue = deque()
+        self.queued = [False] * 81
+        # per house: mask of numbers that left one of its cells
+        self.house_lost = [0] * 27
+        self.house_queue = deque()
+        # (cell, previous mask) for every change, while someone needs undo
+        self.trail = None
+        # time spent on hidden singles, so callers can tell the two apart
+        self.hidden_ns = 0
+        self.sync()
+
+    # queue every cell some other strategy changed since the last look
+    def sync(self):
+        cells = self.grid.cells
+        counted = self.counted
+        if cells == counted:
+            return
+        for k in range(81):
+            if cells[k] != counted[k]:
+                self._touch(k)
+
+    # cell k has just changed: update the counters and queue it
+    def _touch(self, k):
+        new = self.grid.cells[k]
+        old = self.counted[k]
+        self.counted[k] = new
+        if self.trail is not None:
+            self.trail.append((k, old))
+        self.to_remove -= popcount_table[old] - popcount_table[new]
+        self.solved += (popcount_table[new] == 1) - (popcount_table[old] == 1)
+        if not self.queued[k]:
+            self.queued[k] = True
+            self.cell_queue.append(k)
+
+    # process one changed cell, returns candidates removed from its peers
+    def _cell_changed(self, k):
+        cells = self.grid.cells
+        old = self.known[k]
+        new = cells[k]
+        self.known[k] = new
+        self.queued[k] = False
+        if new == 0:
+            self.broken = True
+            return 0
+
+        lost = old & ~new
+        if lost:
+            for h in houses_of_cell[k]:
+                if not self.house_lost[h]:
+                    self.house_queue.append(h)
+                self.house_lost[h] |= lost
+
+        removed = 0
+        if popcount_table[new] == 1 and popcount_table[old] != 1:
+            for peer in peers_of_cell[k]:
+                if cells[peer] & new:
+                    cells[peer] &= ~new
+                    removed += 1
+                    self._touch(peer)
+        return removed
+
+    # check the numbers that left a house, returns candidates removed
+    def _house_changed(self, h):
+        cells = self.grid.cells
+        lost = self.house_lost[h]
+        self.house_lost[h] = 0
+        removed = 0
+        for n in digits_table[lost]:
+            number = 1 << (n - 1)
+            count = 0
+            found = -1
+            for cell in cells_of_house[h]:
+                if cells[cell] & number:
+                    count += 1
+                    found = cell
+            if count == 0:
+                self.broken = True
+                return removed
+            if count == 1 and cells[found] != number:
+                removed += popcount_table[cells[found]] - 1
+                cells[found] = number
+                self._touch(found)
+        return removed
+
+    def propagate(self):
+        """Run naked and hidden singles until nothing changes.
+
+        Returns (naked, hidden): candidates removed by each kind of single.
+        Naked singles are always exhausted before any house is checked for
+        a hidden single, like the simple_elimination / hidden_single cascade.
+        """
+        self.sync()
+        naked = 0
+        hidden = 0
+        while not self.broken:
+            if self.cell_queue:
+                naked += self._cell_changed(self.cell_queue.popleft())
+            elif self.house_queue:
+                start = perf_counter_ns()
+                hidden += self._house_changed(self.house_queue.popleft())
+                self.hidden_ns += perf_counter_ns() - start
+            else:
+                break
+        return naked, hidden
+
+    # put number n into cell k
+    def assign(self, k, n):
+        self.grid.cells[k] = 1 << (n - 1)
+        self._touch(k)
+
+    def undo(self, mark):
+        """Roll the grid back to when the trail was mark entries long.
+
+        The propagator must have been at rest at that point (right after
+        propagate() returned), which is how the search uses it.
+        """
+        cells = self.grid.cells
+        known = self.known
+        counted = self.counted
+        trail = self.trail
+        while len(trail) > mark:
+            k, old = trail.pop()
+            new = counted[k]
+            cells[k] = known[k] = counted[k] = old
+            self.to_remove += popcount_table[old] - popcount_table[new]
+            self.solved += (popcount_table[old] == 1) - \
+                (popcount_table[new] == 1)
+        for k in self.cell_queue:
+            self.queued[k] = False
+        self.cell_queue.clear()
+        for h in self.house_queue:
+            self.house_lost[h] = 0
+        self.house_queue.clear()
+        self.broken = False
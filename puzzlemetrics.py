@@ -0,0 +1,156 @@
+import argparse
+import sys
+import time
+
+import numpy as np
+
+from candidategrid import all_candidates, popcount_table
+from solverapi import parse_lines
+
+# Puzzle metrics
+# Cheap scores of many puzzles at once, from their candidates before any
+# solving: the givens' numbers are taken out of their houses and what is
+# left is measured. Candidates are 9-bit masks as in CandidateGrid, an
+# (N, 81) uint16 array per chunk of puzzles, and every step is a few ORs
+# over views of it. The result is column-oriented:
+# {column name: (N,) array}.
+#   empty     - empty cells
+#   candidates - candidates left in the empty cells
+#   mean_candidates - candidates per empty cell
+#   min_candidates - fewest candidates of an empty cell (9 if none is empty)
+#   entropy   - sum over empty cells of log2(candidates), in bits: the log
+#               of the number of fillings the candidates still allow
+#   naked_singles - empty cells with one candidate left
+#   hidden_singles - empty cells holding a number that has no other place
+#               in one of their houses (and not already a naked single)
+#   clashes   - whether two givens of a house share a number
+#################################################
+
+bit_of_number = np.array([0] + [1 << n for n in range(9)], dtype=np.uint16)
+popcounts = np.array(popcount_table, dtype=np.uint8)
+# log2 of 0..9 candidates; an empty cell with none left counts as 0 bits
+log2_table = np.log2(np.maximum(np.arange(10), 1)).astype(np.float32)
+
+metric_names = ("empty", "candidates", "mean_candidates", "min_candidates",
+                "entropy", "naked_singles", "hidden_singles", "clashes")
+
+# Houses are reshaped views of the (N, 81) masks, like the tensor views of
+# batchsolver.py: (N, 9) for fixed i, (N, 9) for fixed j, (N, 3, 3) blocks.
+
+
+# (N, 81) masks -> per kind of house, the slices of its nine cells
+def _house_cells(x):
+    g = x.reshape(-1, 9, 9)
+    b = x.reshape(-1, 3, 3, 3, 3)
+    return ([g[:, :, k] for k in range(9)],
+            [g[:, k, :] for k in range(9)],
+            [b[:, :, r, :, c] for r in range(3) for c in range(3)])
+
+
+# per kind of house: (numbers in exactly one of its cells, in more than one)
+def _once_and_more(x):
+    result = []
+    for cells in _house_cells(x):
+        once = cells[0].copy()
+        more = np.zeros_like(once)
+        for mask in cells[1:]:
+            more |= once & mask
+            once |= mask
+        result.append((once & ~more, more))
+    return result
+
+
+# per kind of house masks -> (N, 81), OR over the three houses of each cell
+def _spread(fixed_i, fixed_j, blocks):
+    cells = fixed_i[:, :, None] | fixed_j[:, None, :]
+    cells = cells.reshape(-1, 3, 3, 3, 3) | blocks[:, :, None, :, None]
+    return cells.reshape(-1, 81)
+
+
+def _chunk_metrics(puzzles):
+    empty_cells = puzzles == 0
+    given = _once_and_more(bit_of_number[puzzles])
+    taken = _spread(*(once | more for once, more in given))
+    cand = np.where(empty_cells, ~taken & all_candidates, 0).astype(np.uint16)
+    counts = popcounts[cand]
+
+    empty = empty_cells.sum(axis=1, dtype=np.uint8)
+    candidates = counts.sum(axis=1, dtype=np.uint16)
+    hidden = cand & _spread(*(once for once, _ in _once_and_more(cand)))
+    clashes = np.zeros(len(puzzles), dtype=bool)
+    for _, more in given:
+        clashes |= (more != 0).reshape(len(puzzles), -1).any(axis=1)
+    return {
+        "empty": empty,
+        "candidates": candidates,
+        "mean_candidates": (candidates / np.maximum(empty, 1)).astype(np.float32),
+        "min_candidates": np.where(empty_cells, counts, 9).min(axis=1),
+        "entropy": log2_table[counts].sum(axis=1, dtype=np.float32),
+        "naked_singles": (counts == 1).sum(axis=1, dtype=np.uint8),
+        "hidden_singles": ((hidden != 0) & (counts > 1)).sum(axis=1,
+                                                           dtype=np.uint8),
+        "clashes": clashes,
+    }
+
+
+def puzzle_metrics(puzzles, chunk_size=100000):
+    """{metric name: (N,) array} of (N, 81) numbers, 0 for empty cells."""
+    puzzles = np.asarray(puzzles).reshape(-1, 81)
+    chunks = [_chunk_metrics(puzzles[start:start + chunk_size])
+              for start in range(0, len(puzzles), chunk_size)]
+    if not chunks:
+        chunks = [_chunk_metrics(np.zeros((0, 81), dtype=np.uint8))]
+    return {name: np.concatenate([c[name] for c in chunks])
+            for name in metric_names}
+
+
+def corpus_metrics(filename, chunk_size=100000, limit=None):
+    """Metrics of every puzzle of the CSV, with its "id" column.
+
+    Malformed puzzle lines are left out. pandas.DataFrame(result) makes a
+    table of it.
+    """
+    import pandas as pd
+    reader = pd.read_csv(filename, usecols=['id', 'puzzle'], dtype=str,
+                         keep_default_na=False, nrows=limit,
+                         chunksize=chunk_size)
+    ids = []
+    chunks = []
+    for chunk in reader:
+        parsed = parse_lines(chunk['puzzle'].tolist())
+        ok = np.array([p is not None for p in parsed], dtype=bool)
+        ids.append(chunk['id'].to_numpy()[ok])
+        chunks.append(puzzle_metrics(
+            np.array([p for p in parsed if p is not None]).reshape(-1, 81),
+            chunk_size))
+    if not chunks:
+        ids.append(np.array([], dtype=object))
+        chunks.append(puzzle_metrics(np.zeros((0, 81), dtype=np.uint8)))
+    result = {"id": np.concatenate(ids)}
+    for name in metric_names:
+        result[name] = np.concatenate([c[name] for c in chunks])
+    return result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Score puzzles by their candidates.")
+    parser.add_argument("csv", nargs="?", default="sudoku-3m.csv")
+    parser.add_argument("--chunk-size", type=int, default=100000)
+    parser.add_argument("--limit", type=int, help="only the first rows")
+    parser.add_argument("--output", default="puzzle_metrics.csv")
+    args = parser.parse_args(argv)
+
+    import pandas as pd
+    start = time.perf_counter()
+    metrics = corpus_metrics(args.csv, args.chunk_size, args.limit)
+    elapsed = time.perf_counter() - start
+    table = pd.DataFrame(metrics)
+    print(table.describe().T.to_string())
+    print("%d puzzles in %.1fs" % (len(table), elapsed))
+    table.to_csv(args.output, index=False)
+    print("Wrote", args.output)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,149 @@
+import sys
+
+import numpy as np
+
+from helperfunctions import format_solutions, parse_puzzles
+
+# Packed binary puzzle store
+# sudoku-3m.csv converted once into a fixed-width .npy file of records:
+# puzzle and solution as 81 packed nibbles each (0 is an empty cell), the clue
+# count and a difficulty code. Loading memory-maps the file, so any number of
+# processes share one page-cached copy and records are read by index in O(1).
+#################################################
+
+record_dtype = np.dtype([
+    ('id', '<u4'),
+    ('puzzle', 'u1', 41),
+    ('solution', 'u1', 41),
+    ('clues', 'u1'),
+    ('difficulty', 'u1'),
+])
+
+difficulty_names = ("Easy", "Medium", "Difficult")
+
+
+# ratings -> 0, 1, 2 with the thresholds of categorize_difficulty
+def difficulty_codes(ratings):
+    return np.digitize(np.asarray(ratings, dtype=float), [2.8, 5.7]).astype(np.uint8)
+
+
+# column of 81-char strings ('.' or '0' for empty) -> (N, 81) uint8
+digits_from_strings = parse_puzzles
+
+
+# (N, 81) digits -> (N, 41) bytes, two cells per byte
+def pack_nibbles(digits):
+    padded = np.zeros((len(digits), 82), dtype=np.uint8)
+    padded[:, :81] = digits
+    return (padded[:, 0::2] << 4) | padded[:, 1::2]
+
+
+# (N, 41) bytes -> (N, 81) digits
+def unpack_nibbles(packed):
+    packed = np.asarray(packed)
+    digits = np.empty(packed.shape[:-1] + (82,), dtype=np.uint8)
+    digits[..., 0::2] = packed >> 4
+    digits[..., 1::2] = packed & 0x0F
+    return digits[..., :81]
+
+
+def count_rows(filename):
+    """Number of data rows in a CSV with a header line."""
+    lines = 0
+    last = b"\n"
+    with open(filename, "rb") as f:
+        while True:
+            block = f.read(1 << 24)
+            if not block:
+                break
+            lines += block.count(b"\n")
+            last = block[-1:]
+    if last != b"\n":
+        lines += 1
+    return lines - 1
+
+
+def convert_csv(csv_filename, store_filename, chunk_size=500000):
+    """Write the puzzles of a sudoku-3m style CSV into a packed .npy store."""
+    import pandas as pd
+    n = count_rows(csv_filename)
+    records = np.lib.format.open_memmap(store_filename, mode="w+",
+                                        dtype=record_dtype, shape=(n,))
+    start = 0
+    # all-digit solutions would otherwise be parsed as huge integers
+    for chunk in pd.read_csv(csv_filename, chunksize=chunk_size,
+                             usecols=['id', 'puzzle', 'solution', 'clues',
+                                      'difficulty'],
+                             dtype={'puzzle': str, 'solution': str}):
+        out = records[start:start + len(chunk)]
+        out['id'] = chunk['id'].to_numpy()
+        out['puzzle'] = pack_nibbles(digits_from_strings(chunk['puzzle']))
+        out['solution'] = pack_nibbles(digits_from_strings(chunk['solution']))
+        out['clues'] = chunk['clues'].to_numpy()
+        out['difficulty'] = difficulty_codes(chunk['difficulty'])
+        start += len(chunk)
+    records.flush()
+    return n
+
+
+class PuzzleStore:
+    """Read-only, memory-mapped view of a store written by convert_csv."""
+
+    def __init__(self, filename):
+        self.records = np.load(filename, mmap_mode="r")
+        self._id_offset = None
+        self._id_order = None
+
+    def __len__(self):
+        return len(self.records)
+
+    def __getitem__(self, index):
+        """Raw record(s); slices are zero-copy views of the mapped file."""
+        return self.records[index]
+
+    def index_of(self, puzzle_id):
+        """Index of the record with this id.
+
+        O(1) when ids are consecutive (as in sudoku-3m.csv), otherwise a
+        binary search over an id index built on first use.
+        """
+        if self._id_offset is None and self._id_order is None:
+            ids = self.records['id']
+            if len(ids) and np.all(np.diff(ids.astype(np.int64)) == 1):
+                self._id_offset = int(ids[0])
+            else:
+                self._id_order = np.argsort(ids, kind="stable")
+        if self._id_offset is not None:
+            index = puzzle_id - self._id_offset
+            if not 0 <= index < len(self.records):
+                raise KeyError(puzzle_id)
+            return index
+        ids = self.records['id']
+        pos = np.searchsorted(ids, puzzle_id, sorter=self._id_order)
+        if pos == len(ids) or ids[self._id_order[pos]] != puzzle_id:
+            raise KeyError(puzzle_id)
+        return int(self._id_order[pos])
+
+    def by_id(self, puzzle_id):
+        return self.records[self.index_of(puzzle_id)]
+
+    def puzzles(self, start=0, stop=None):
+        """(N, 81) uint8 puzzles of a range of records, 0 for empty cells."""
+        return unpack_nibbles(self.records['puzzle'][start:stop])
+
+    def solutions(self, start=0, stop=None):
+        return unpack_nibbles(self.records['solution'][start:stop])
+
+    def line(self, index):
+        """One puzzle as an 81-char string, as solve_from_line expects."""
+        return format_solutions(unpack_nibbles(self.records['puzzle'][index]))[0]
+
+    def difficulty(self, index):
+        return difficulty_names[self.records['difficulty'][index]]
+
+
+if __name__ == "__main__":
+    csv_filename = sys.argv[1] if len(sys.argv) > 1 else "sudoku-3m.csv"
+    store_filename = sys.argv[2] if len(sys.argv) > 2 else "sudoku-3m.npy"
+    print("Wrote", convert_csv(csv_filename, store_filename), "puzzles to",
+          store_filename)
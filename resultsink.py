@@ -0,0 +1,169 @@
+import json
+import os
+from collections import namedtuple
+
+from instrumentation import StrategyStats, strategy_names
+
+# Result sink
+# Long runs write every puzzle's result as soon as it is solved, to an
+# append-only CSV, so that a crash or Ctrl-C loses at most the last batch.
+# Rows are buffered and written flush_every at a time; after every write the
+# data is synced to disk and a small checkpoint file next to it is replaced
+# atomically, recording how many puzzles are done, the id of the last one,
+# how long the CSV is and the StrategyStats of the puzzles written.
+# Opening a sink on the same path again resumes: anything past the
+# checkpoint (a write that was cut short) is cut off, and `done` is the
+# number of puzzles the caller can skip. The checkpoint also names the
+# input the results are of, and a sink refuses to resume another one.
+# A run that got to the end marks its checkpoint finished with finish();
+# the next sink on that path starts a new file instead of resuming.
+#################################################
+
+report_columns = tuple(name.lower().replace(" ", "_") for name in strategy_names)
+result_columns = ("index", "id", "difficulty", "status", "elapsed",
+                  "solution") + report_columns
+
+# a row of the results file, report being the 7 counts as a list
+ResultRow = namedtuple("ResultRow", ["index", "id", "difficulty", "status",
+                                     "elapsed", "solution", "report"])
+
+
+def read_results(path, end=None):
+    """Yield the ResultRows of a results file, up to byte offset end."""
+    with open(path, "rb") as f:
+        position = len(f.readline())
+        for line in f:
+            position += len(line)
+            if end is not None and position > end:
+                return
+            fields = line.decode("ascii").rstrip("\n").split(",")
+            yield ResultRow(int(fields[0]), fields[1], fields[2], fields[3],
+                            float(fields[4]), fields[5],
+                            [int(x) for x in fields[6:]])
+
+
+class ResultSink:
+    """Append-only CSV of per-puzzle results with a checkpoint to resume from.
+
+    The checkpoint is path + ".checkpoint"; without one, or if it belongs
+    to a finished run, the results file is started from scratch. source names the input (e.g. its file name);
+    resuming a file written for another source raises ValueError.
+    stats is the StrategyStats of the puzzles written so far.
+    """
+
+    def __init__(self, path, flush_every=1000, source=None):
+        self.path = path
+        self.checkpoint_path = path + ".checkpoint"
+        self.flush_every = flush_every
+        self.source = source
+        self.buffer = []
+        self._buffer_ids = []
+        # rows at the front of the buffer whose stats are in _pending_stats
+        self._covered = 0
+        self._pending_stats = StrategyStats()
+        self._with_stats = False
+        self.finished = False
+        checkpoint = self._read_checkpoint()
+        if checkpoint is None or checkpoint.get("finished"):
+            self.done = 0
+            self.last_id = None
+            self.stats = StrategyStats()
+            self.file = open(path, "wb")
+            self.file.write((",".join(result_columns) + "\n").encode("ascii"))
+            self._sync()
+        else:
+            if checkpoint.get("source") != source:
+                raise ValueError(
+                    "%s holds results of %r, not of %r; delete it and %s to "
+                    "start over" % (path, checkpoint.get("source"), source,
+                                    self.checkpoint_path))
+            self.done = checkpoint["done"]
+            self.last_id = checkpoint["last_id"]
+            self.stats = StrategyStats.from_dict(checkpoint["stats"])
+            self.file = open(path, "r+b")
+            self.file.truncate(checkpoint["offset"])
+            self.file.seek(checkpoint["offset"])
+
+    def _read_checkpoint(self):
+        if not os.path.exists(self.checkpoint_path) or \
+                not os.path.exists(self.path):
+            return None
+        with open(self.checkpoint_path) as f:
+            return json.load(f)
+
+    # data to disk first, then the checkpoint that points past it
+    def _sync(self):
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        tmp = self.checkpoint_path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump({"source": self.source, "done": self.done,
+                       "last_id": self.last_id, "offset": self.file.tell(),
+                       "stats": self.stats.as_dict(),
+                       "finished": self.finished}, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.checkpoint_path)
+
+    def add(self, row_id, difficulty, solution, status, report, elapsed,
+            stats=None):
+        """Queue the result of the next puzzle; solution is an 81-char string.
+
+        stats is the StrategyStats of this puzzle, or of all the puzzles
+        added since the last one that came with stats (a worker's chunk).
+        """
+        self.buffer.append("%d,%s,%s,%s,%.6f,%s,%s\n" % (
+            self.done + len(self.buffer), row_id, difficulty, status, elapsed,
+            solution, ",".join(str(r) for r in report)))
+        self._buffer_ids.append(str(row_id))
+        if stats is not None:
+            self._pending_stats.merge(stats)
+            self._with_stats = True
+            self._covered = len(self.buffer)
+        # once results come with stats, only write where rows and stats agree
+        if len(self.buffer) >= self.flush_every and \
+                (stats is not None or not self._with_stats):
+            self.flush()
+
+    def flush(self):
+        """Write the queued rows.
+
+        Once results come with stats, only the rows whose stats have arrived
+        are written; the others wait for them, and are solved again after a
+        resume if the sink is closed first.
+        """
+        end = self._covered if self._with_stats else len(self.buffer)
+        if not end:
+            return
+        self.file.write("".join(self.buffer[:end]).encode("ascii"))
+        self.done += end
+        self.last_id = self._buffer_ids[end - 1]
+        self.stats.merge(self._pending_stats)
+        del self.buffer[:end]
+        del self._buffer_ids[:end]
+        self._covered = 0
+        self._pending_stats = StrategyStats()
+        self._sync()
+
+    def finish(self):
+        """Write everything and mark the run complete, see the top."""
+        self.flush()
+        self.finished = True
+        self._sync()
+
+    def results(self):
+        """The ResultRows written so far, e.g. to rebuild stats on resume."""
+        self.flush()
+        return read_results(self.path, self.file.tell())
+
+    def close(self):
+        if self.file is not None:
+            self.flush()
+            self.file.close()
+            self.file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,178 @@
+# Streaming run statistics
+# Everything a long run reports, kept in constant memory: count, mean and
+# variance with Welford's method, p50/p95/p99 of the solving time per
+# difficulty tier with the P-square algorithm (Jain & Chlamtac, 1985) and
+# the summed strategy usage. Nothing per puzzle is stored.
+#################################################
+
+difficulty_tiers = ("Easy", "Medium", "Difficult")
+quantile_levels = (0.5, 0.95, 0.99)
+
+
+class RunningStats:
+    """Count, mean and variance of a stream of numbers (Welford)."""
+
+    __slots__ = ("count", "mean", "m2", "min", "max")
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min = float("inf")
+        self.max = float("-inf")
+
+    def add(self, x):
+        self.count += 1
+        delta = x - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (x - self.mean)
+        if x < self.min:
+            self.min = x
+        if x > self.max:
+            self.max = x
+
+    def merge(self, other):
+        """Combine with the stats of another stream (Chan et al.)."""
+        if other.count == 0:
+            return self
+        count = self.count + other.count
+        delta = other.mean - self.mean
+        self.m2 += other.m2 + delta * delta * self.count * other.count / count
+        self.mean += delta * other.count / count
+        self.count = count
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        return self
+
+    @property
+    def variance(self):
+        """Sample variance, 0 with fewer than two values."""
+        return self.m2 / (self.count - 1) if self.count > 1 else 0.0
+
+    @property
+    def std(self):
+        return self.variance ** 0.5
+
+
+class P2Quantile:
+    """Streaming estimate of one quantile from five markers (P-square).
+
+    Exact while there are five values or fewer.
+    """
+
+    __slots__ = ("p", "heights", "positions", "desired", "increments")
+
+    def __init__(self, p):
+        self.p = p
+        self.heights = []
+        self.positions = [1, 2, 3, 4, 5]
+        self.desired = [1, 1 + 2 * p, 1 + 4 * p, 3 + 2 * p, 5]
+        self.increments = [0, p / 2, p, (1 + p) / 2, 1]
+
+    def add(self, x):
+        q = self.heights
+        if len(q) < 5:
+            q.append(x)
+            q.sort()
+            return
+
+        # cell of the new value, stretching the ends if needed
+        if x < q[0]:
+            q[0] = x
+            k = 0
+        elif x >= q[4]:
+            q[4] = x
+            k = 3
+        else:
+            k = 0
+            while x >= q[k + 1]:
+                k += 1
+        n = self.positions
+        for i in range(k + 1, 5):
+            n[i] += 1
+        for i in range(5):
+            self.desired[i] += self.increments[i]
+
+        # move the middle markers towards their desired positions
+        for i in range(1, 4):
+            d = self.desired[i] - n[i]
+            if (d >= 1 and n[i + 1] - n[i] > 1) or \
+                    (d <= -1 and n[i - 1] - n[i] < -1):
+                d = 1 if d > 0 else -1
+                h = self._parabolic(i, d)
+                if not q[i - 1] < h < q[i + 1]:
+                    h = q[i] + d * (q[i + d] - q[i]) / (n[i + d] - n[i])
+                q[i] = h
+                n[i] += d
+
+    def _parabolic(self, i, d):
+        q, n = self.heights, self.positions
+        return q[i] + d / (n[i + 1] - n[i - 1]) * (
+            (n[i] - n[i - 1] + d) * (q[i + 1] - q[i]) / (n[i + 1] - n[i]) +
+            (n[i + 1] - n[i] - d) * (q[i] - q[i - 1]) / (n[i] - n[i - 1]))
+
+    def value(self):
+        q = self.heights
+        if not q:
+            return 0.0
+        if len(q) < 5:
+            # nearest rank on the few values seen so far
+            return q[min(len(q) - 1, int(self.p * len(q)))]
+        return q[2]
+
+
+class RunStats:
+    """Aggregate of a whole run: solving times per tier and strategy usage.
+
+    Feed it one puzzle at a time with add(); plot_strategy_count and
+    plot_time_difficulty read it directly.
+    """
+
+    def __init__(self):
+        self.times = RunningStats()
+        self.tier_times = {tier: RunningStats() for tier in difficulty_tiers}
+        self.tier_quantiles = {tier: [P2Quantile(p) for p in quantile_levels]
+                               for tier in difficulty_tiers}
+        self.entropy = RunningStats()
+        self.strategy_usage = [0] * 7
+        self.unsolved = 0
+
+    def add(self, difficulty, elapsed, report, entropy=None, solved=True):
+        self.times.add(elapsed)
+        if difficulty not in self.tier_times:
+            self.tier_times[difficulty] = RunningStats()
+            self.tier_quantiles[difficulty] = [P2Quantile(p)
+                                               for p in quantile_levels]
+        self.tier_times[difficulty].add(elapsed)
+        for quantile in self.tier_quantiles[difficulty]:
+            quantile.add(elapsed)
+        if entropy is not None:
+            self.entropy.add(entropy)
+        for i in range(7):
+            self.strategy_usage[i] += report[i]
+        if not solved:
+            self.unsolved += 1
+
+    @property
+    def count(self):
+        return self.times.count
+
+    def mean_times(self):
+        """{tier: mean solving time}, 0 for tiers without puzzles."""
+        return {tier: stats.mean for tier, stats in self.tier_times.items()}
+
+    def quantiles(self, tier):
+        """{0.5: p50, 0.95: p95, 0.99: p99} of the solving time of a tier."""
+        return {q.p: q.value() for q in self.tier_quantiles[tier]}
+
+    def print_summary(self):
+        print("Puzzles solved: %d" % (self.count - self.unsolved))
+        print("Puzzles unsolved: %d" % self.unsolved)
+        print("Mean time over all %d: %.4fs (std %.4fs)" %
+              (self.count, self.times.mean, self.times.std))
+        print("%-10s %8s %10s %10s %10s %10s" %
+              ("Tier", "Count", "Mean (s)", "p50 (s)", "p95 (s)", "p99 (s)"))
+        for tier, stats in self.tier_times.items():
+            q = self.quantiles(tier)
+            print("%-10s %8d %10.4f %10.4f %10.4f %10.4f" %
+                  (tier, stats.count, stats.mean, q[0.5], q[0.95], q[0.99]))
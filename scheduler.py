@@ -0,0 +1,142 @@
+# Strategy schedulers
+# Decide which of the logic methods solve() tries after the singles, and in
+# what order. Methods are named by their index in the report:
+#   2 CSP, 3 Intersection, 4 Fish (X-Wing, Swordfish, Jellyfish), 5 3D Medusa
+# Singles always run first and backtracking always finishes whatever is
+# left, so a scheduler only changes how much time is spent before that,
+# never the solution.
+#
+# A scheduler sees every call through record() and can keep what it learns
+# across puzzles: use one scheduler per difficulty tier to learn per tier.
+#################################################
+
+logic_steps = (2, 3, 4, 5)
+
+
+class FixedOrder:
+    """The original cascade.
+
+    Tries the steps in order and goes back to the singles after the first
+    one that removes anything (after all of them with all_at_once). Leaving
+    steps out, e.g. FixedOrder(steps=(2, 3)), goes to backtracking as soon
+    as those stop producing.
+    """
+
+    def __init__(self, steps=logic_steps, all_at_once=False):
+        self.steps = tuple(steps)
+        self.all_at_once = all_at_once
+
+    def start_puzzle(self):
+        pass
+
+    def order(self):
+        return self.steps
+
+    def record(self, i, removed, elapsed_ns):
+        pass
+
+
+class CostOrdered:
+    """Cheapest step first, by measured time per candidate removed.
+
+    Costs are summed over all puzzles this scheduler has seen; steps with
+    fewer than `explore` calls keep their fixed place in front. A step that
+    removed nothing on its last `patience` calls on the current puzzle is
+    skipped for the rest of it, and one that paid off on fewer than
+    `min_yield` of its calls (once it has `explore` calls) is dropped.
+    """
+
+    def __init__(self, explore=20, patience=2, min_yield=0.0,
+                 all_at_once=False):
+        self.explore = explore
+        self.patience = patience
+        self.min_yield = min_yield
+        self.all_at_once = all_at_once
+        self.calls = [0] * 7
+        self.productive = [0] * 7
+        self.time_ns = [0] * 7
+        self.removed = [0] * 7
+        self.idle = [0] * 7
+
+    def cost(self, i):
+        """Nanoseconds per candidate removed.
+
+        A step that never removed any costs all its time, as if it had
+        removed one, so it goes behind the steps that pay off.
+        """
+        return self.time_ns[i] / max(self.removed[i], 1)
+
+    def start_puzzle(self):
+        self.idle = [0] * 7
+
+    def order(self):
+        steps = []
+        for i in logic_steps:
+            if self.idle[i] >= self.patience:
+                continue
+            if self.calls[i] >= self.explore and \
+                    self.productive[i] < self.min_yield * self.calls[i]:
+                continue
+            steps.append(i)
+
+        # unexplored steps first in the fixed order, then by cost
+        def key(i):
+            if self.calls[i] < self.explore:
+                return (0, i)
+            return (1, self.cost(i))
+        return sorted(steps, key=key)
+
+    def record(self, i, removed, elapsed_ns):
+        self.calls[i] += 1
+        self.time_ns[i] += elapsed_ns
+        self.removed[i] += removed
+        if removed:
+            self.productive[i] += 1
+            self.idle[i] = 0
+        else:
+            self.idle[i] += 1
+
+
+class BudgetCapped:
+    """Another scheduler, until the puzzle has used up its time budget.
+
+    Once the logic steps have taken budget_ms on the current puzzle,
+    solve() goes straight to backtracking.
+    """
+
+    def __init__(self, budget_ms=20.0, base=None):
+        self.budget_ns = int(budget_ms * 1e6)
+        self.base = base if base is not None else FixedOrder()
+        self.spent_ns = 0
+
+    @property
+    def all_at_once(self):
+        return self.base.all_at_once
+
+    def start_puzzle(self):
+        self.spent_ns = 0
+        self.base.start_puzzle()
+
+    def order(self):
+        if self.spent_ns >= self.budget_ns:
+            return ()
+        return self.base.order()
+
+    def record(self, i, removed, elapsed_ns):
+        self.spent_ns += elapsed_ns
+        self.base.record(i, removed, elapsed_ns)
+
+
+schedulers = {
+    "fixed": FixedOrder,
+    "cost": CostOrdered,
+    "budget": BudgetCapped,
+}
+
+
+def make_scheduler(name, **kwargs):
+    """A new scheduler by name: 'fixed', 'cost' or 'budget'."""
+    if name not in schedulers:
+        raise ValueError("Unknown scheduler %r, expected one of %s" %
+                         (name, ", ".join(schedulers)))
+    return schedulers[name](**kwargs)
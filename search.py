@@ -0,0 +1,94 @@
+from candidategrid import digits_table, popcount_table
+from indextables import cells_of_house
+from propagation import Propagator
+
+# Backtracking search
+# Guess in the cell with the fewest candidates, propagate singles after every
+# guess and undo the changes from the propagator's trail instead of copying
+# the grid at every branch. Contradictions (an empty cell, or a number with
+# nowhere to go in a house) end a branch as soon as propagation finds them.
+# When no cell is down to two candidates, a number with only two places left
+# in a house is a two-way branch as well, and is taken instead: guessing in
+# cells alone can wander for a very long time on sparse puzzles with many
+# solutions.
+#################################################
+
+
+# unsolved cell with the fewest candidates, -1 if every cell is solved
+def fewest_candidates_cell(cells):
+    best = -1
+    best_count = 10
+    for k in range(81):
+        count = popcount_table[cells[k]]
+        if 1 < count < best_count:
+            best = k
+            best_count = count
+            if count == 2:
+                break
+    return best
+
+
+# (number, cell, cell) of a number with exactly two places in a house, or None
+def two_places(cells):
+    for house in cells_of_house:
+        once = twice = more = 0
+        for k in house:
+            mask = cells[k]
+            more |= twice & mask
+            twice |= once & mask
+            once |= mask
+        pair = twice & ~more
+        if pair:
+            bit = pair & -pair
+            a, b = [k for k in house if cells[k] & bit]
+            return bit.bit_length(), a, b
+    return None
+
+
+def search(grid, limit=1, propagation=None):
+    """Find up to limit solutions of the grid.
+
+    Returns (solutions, stats): a list of solved CandidateGrid copies and a
+    dict with the number of nodes visited and of guesses taken back.
+    With limit=1 the grid itself is left in the solved state; with a
+    larger limit it is rolled back to how it came in.
+    """
+    if propagation is None:
+        propagation = Propagator(grid)
+    propagation.trail = []
+    cells = grid.cells
+    solutions = []
+    stats = {"nodes": 0, "backtracks": 0}
+
+    def node():
+        stats["nodes"] += 1
+        propagation.propagate()
+        if propagation.broken:
+            return
+        if propagation.to_remove == 0:
+            solutions.append(grid.copy())
+            return
+
+        cell = fewest_candidates_cell(cells)
+        branches = None
+        if popcount_table[cells[cell]] > 2:
+            pair = two_places(cells)
+            if pair is not None:
+                n, a, b = pair
+                branches = ((a, n), (b, n))
+        if branches is None:
+            branches = [(cell, n) for n in digits_table[cells[cell]]]
+        mark = len(propagation.trail)
+        for cell, n in branches:
+            propagation.assign(cell, n)
+            node()
+            if len(solutions) >= limit:
+                return
+            propagation.undo(mark)
+            stats["backtracks"] += 1
+
+    node()
+    if limit > 1:
+        propagation.undo(0)
+    propagation.trail = None
+    return solutions, stats
@@ -0,0 +1,246 @@
+import sqlite3
+from collections import OrderedDict
+from itertools import permutations, product
+
+import numpy as np
+
+from candidategrid import CandidateGrid
+
+# Solution cache
+# Puzzles are looked up by a canonical form under the Sudoku symmetries:
+# transposition, permuting bands, rows within a band, stacks and columns
+# within a stack, and relabelling the digits. Two puzzles that differ only
+# by those map to the same key, and the cached solution is mapped back
+# through the transform of the puzzle at hand.
+#
+# The form is a cheap one, not the exact minimum over all 2 * 6^8 layouts:
+# rows and columns are sorted by invariants (clue count, then the clue
+# counts of the lines they cross), only ties are tried both ways (at most
+# `cap` layouts) and digits are numbered in order of first appearance.
+# Equivalent puzzles may therefore still miss each other now and then, but
+# a hit is always a valid solution of the puzzle asked for.
+#
+# Two tiers: a bounded in-memory LRU and an optional sqlite3 file. The LRU
+# also keeps the exact givens of recent puzzles, so a puzzle seen as is
+# skips the canonical form too.
+#################################################
+
+
+# orderings of indices that sort them by key, trying every order of ties
+def _tie_orders(indices, key):
+    ranked = sorted(indices, key=key)
+    groups = []
+    for i in ranked:
+        if groups and key(groups[-1][0]) == key(i):
+            groups[-1].append(i)
+        else:
+            groups.append([i])
+    return [sum(choice, ()) for choice in
+            product(*(list(permutations(group)) for group in groups))]
+
+
+# up to cap orders of the 9 lines, bands sorted first and lines within them
+def _line_orders(keys, cap):
+    band_keys = [sorted(keys[3 * b:3 * b + 3]) for b in range(3)]
+    in_band = [_tie_orders(range(3 * b, 3 * b + 3), keys.__getitem__)
+               for b in range(3)]
+    orders = []
+    for bands in _tie_orders(range(3), band_keys.__getitem__):
+        for lines in product(*(in_band[b] for b in bands)):
+            orders.append(sum(lines, ()))
+            if len(orders) >= cap:
+                return orders
+    return orders
+
+
+# (V, 81) puzzles -> (V, 10) digit maps numbering digits by first appearance
+def _first_appearance_labels(variants):
+    present = variants[:, :, None] == np.arange(1, 10)
+    first = np.where(present.any(axis=1), present.argmax(axis=1), 81)
+    order = np.argsort(first, axis=1, kind="stable")
+    labels = np.zeros((len(variants), 10), dtype=np.uint8)
+    np.put_along_axis(labels, order + 1,
+                      np.arange(1, 10, dtype=np.uint8)[None, :], axis=1)
+    return labels
+
+
+def canonical_form(grid, cap=512):
+    """(key, transform) of a 9x9 array of givens, 0 for empty cells.
+
+    key is an 81-byte string; transform is (transposed, row order,
+    column order, digit labels) as map_to_canonical/map_from_canonical use.
+    """
+    grid = np.asarray(grid, dtype=np.uint8).reshape(9, 9)
+    best = None
+    for transposed in (False, True):
+        g = grid.T if transposed else grid
+        filled = g > 0
+        row_counts = filled.sum(axis=1)
+        col_counts = filled.sum(axis=0)
+        row_keys = [(row_counts[i], sorted(col_counts[filled[i]]))
+                    for i in range(9)]
+        col_keys = [(col_counts[j], sorted(row_counts[filled[:, j]]))
+                    for j in range(9)]
+        rows = np.array(_line_orders(row_keys, cap))
+        cols = np.array(_line_orders(col_keys, max(1, cap // len(rows))))
+
+        variants = g[rows[:, None, :, None], cols[None, :, None, :]]
+        variants = variants.reshape(-1, 81)
+        labels = _first_appearance_labels(variants)
+        relabelled = np.take_along_axis(labels, variants, axis=1)
+        i = np.lexsort(relabelled.T[::-1])[0]
+        key = (relabelled[i] + ord("0")).tobytes()
+        if best is None or key < best[0]:
+            transform = (transposed, rows[i // len(cols)], cols[i % len(cols)],
+                         labels[i])
+            best = (key, transform)
+    return best
+
+
+def map_to_canonical(solution, transform):
+    transposed, rows, cols, labels = transform
+    s = np.asarray(solution, dtype=np.uint8).reshape(9, 9)
+    if transposed:
+        s = s.T
+    return labels[s[np.ix_(rows, cols)]]
+
+
+def map_from_canonical(solution, transform):
+    transposed, rows, cols, labels = transform
+    unlabel = np.zeros(10, dtype=np.uint8)
+    unlabel[labels] = np.arange(10, dtype=np.uint8)
+    s = np.empty((9, 9), dtype=np.uint8)
+    s[np.ix_(rows, cols)] = unlabel[np.asarray(solution).reshape(9, 9)]
+    return s.T if transposed else s
+
+
+# 9x9 array, 81 numbers or CandidateGrid -> 9x9 givens, 0 for empty cells
+def givens_of(puzzle):
+    if isinstance(puzzle, CandidateGrid):
+        return puzzle.to_array()
+    return np.asarray(puzzle).reshape(9, 9)
+
+
+class SolutionCache:
+    """Canonical-form cache of solved puzzles.
+
+    maxsize bounds the in-memory LRU tier; with a path, solutions are also
+    kept in (and read back from) a sqlite3 file across runs.
+    """
+
+    def __init__(self, maxsize=100000, path=None, cap=512, commit_every=1000):
+        self.maxsize = maxsize
+        self.cap = cap
+        self.memory = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        # (exact key, key, transform) of the last miss, which solve() puts
+        # right after, so the canonical form is computed once per puzzle
+        self._missed = None
+        self.db = None
+        self.commit_every = commit_every
+        self._uncommitted = 0
+        if path is not None:
+            self.db = sqlite3.connect(path)
+            self.db.execute("CREATE TABLE IF NOT EXISTS solutions "
+                            "(key BLOB PRIMARY KEY, solution BLOB NOT NULL)")
+
+    def _remember(self, key, solution):
+        self.memory[key] = solution
+        self.memory.move_to_end(key)
+        if len(self.memory) > self.maxsize:
+            self.memory.popitem(last=False)
+
+    def _lookup(self, key):
+        solution = self.memory.get(key)
+        if solution is not None:
+            self.memory.move_to_end(key)
+            return solution
+        if self.db is not None:
+            row = self.db.execute("SELECT solution FROM solutions WHERE key = ?",
+                                  (key,)).fetchone()
+            if row is not None:
+                solution = bytes(row[0])
+                self._remember(key, solution)
+                return solution
+        return None
+
+    def get(self, puzzle):
+        """The cached 9x9 solution of a puzzle, or None.
+
+        With a CandidateGrid, a solution that does not fit its candidates
+        counts as a miss.
+        """
+        givens = givens_of(puzzle)
+        exact = b"=" + givens.astype(np.uint8).tobytes()
+        key = transform = None
+        solution = self.memory.get(exact)
+        if solution is not None:
+            self.memory.move_to_end(exact)
+            solution = np.frombuffer(solution, dtype=np.uint8).reshape(9, 9)
+        else:
+            key, transform = canonical_form(givens, self.cap)
+            solution = self._lookup(key)
+            if solution is None:
+                self._miss(exact, key, transform)
+                return None
+            solution = map_from_canonical(
+                np.frombuffer(solution, dtype=np.uint8) - ord("0"), transform)
+        if isinstance(puzzle, CandidateGrid):
+            for k, n in enumerate(solution.ravel().tolist()):
+                if not puzzle.cells[k] >> (n - 1) & 1:
+                    self._miss(exact, key, transform)
+                    return None
+        self._remember(exact, solution.tobytes())
+        self.hits += 1
+        return solution
+
+    def _miss(self, exact, key, transform):
+        self.misses += 1
+        if key is not None:
+            self._missed = (exact, key, transform)
+
+    def put(self, puzzle, solution):
+        """Cache a complete solution of the puzzle.
+
+        The solution is not checked; solve() only puts one it verified.
+        """
+        solution = np.asarray(solution, dtype=np.uint8).reshape(9, 9)
+        if not solution.all():
+            return
+        givens = givens_of(puzzle)
+        exact = b"=" + givens.astype(np.uint8).tobytes()
+        if self._missed is not None and self._missed[0] == exact:
+            _, key, transform = self._missed
+        else:
+            key, transform = canonical_form(givens, self.cap)
+        self._missed = None
+        value = (map_to_canonical(solution, transform) + ord("0")).tobytes()
+        self._remember(key, value)
+        self._remember(exact, solution.tobytes())
+        if self.db is not None:
+            self.db.execute("INSERT OR IGNORE INTO solutions VALUES (?, ?)",
+                            (key, value))
+            self._uncommitted += 1
+            if self._uncommitted >= self.commit_every:
+                self.flush()
+
+    def flush(self):
+        if self.db is not None:
+            self.db.commit()
+            self._uncommitted = 0
+
+    def close(self):
+        if self.db is not None:
+            self.flush()
+            self.db.close()
+            self.db = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __len__(self):
+        return len(self.memory)
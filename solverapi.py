@@ -0,0 +1,117 @@
+import time
+from collections import namedtuple
+from itertools import islice
+
+import numpy as np
+
+from batchsolver import solve_batch
+from helperfunctions import format_solutions, parse_puzzles, puzzle_text
+from strategies import solve
+
+# Library API
+# solve_many() solves puzzles one by one (or in vectorized batches) and
+# yields a result record for each, in input order. Nothing is printed and
+# nothing from the plotting side (matplotlib, pandas) is imported, so it can
+# run inside a service or a pipeline and its timings are of solving only.
+#################################################
+
+# index: position in the input
+# solution: 81-char string of digits (or an (81,) uint8 array with
+#   as_array=True), None for invalid input; 0 marks cells a broken puzzle
+#   left unsolved
+# status: "solved", "broken" (no solution) or "invalid" (not a puzzle line)
+# report: candidates removed by each of the 7 methods
+# elapsed: seconds spent solving
+SolveResult = namedtuple("SolveResult",
+                         ["index", "solution", "status", "report", "elapsed"])
+
+puzzle_characters = frozenset("0123456789.")
+
+
+# 81-char line ('.' or '0' empty), str or bytes -> (81,) uint8, None if it
+# is not a puzzle
+def parse_line(line):
+    line = puzzle_text(line).strip()[0:81]
+    if len(line) != 81 or not puzzle_characters.issuperset(line):
+        return None
+    return parse_puzzles(line)[0]
+
+
+# a list of lines -> list of (81,) uint8 or None, in one step when all are fine
+def parse_lines(lines):
+    stripped = [puzzle_text(line).strip()[0:81] for line in lines]
+    if all(len(line) == 81 for line in stripped):
+        try:
+            return list(parse_puzzles(stripped))
+        except (ValueError, UnicodeEncodeError):
+            pass
+    return [parse_line(line) for line in lines]
+
+
+def is_solution(solution):
+    """Whether 81 numbers are a complete grid with every number once a house."""
+    g = np.asarray(solution).reshape(9, 9)
+    blocks = g.reshape(3, 3, 3, 3).swapaxes(1, 2).reshape(9, 9)
+    return all((np.sort(lines, axis=1) == np.arange(1, 10)).all()
+               for lines in (g, g.T, blocks))
+
+
+def _result(index, solution, status, report, elapsed, as_array):
+    if not as_array:
+        solution = format_solutions(solution)[0]
+    return SolveResult(index, solution, status, report, elapsed)
+
+
+def solve_many(lines, backend="logic", as_array=False, batch_size=None,
+               scheduler=None, cache=None):
+    """Solve every puzzle line of an iterable, yielding SolveResult records.
+
+    Lines are consumed lazily. With batch_size, lines are solved batch_size
+    at a time with solve_batch(), which is much faster on easy puzzles;
+    elapsed is then the share of the batch time of each puzzle.
+    backend, scheduler and cache are passed on to solve().
+    """
+    if batch_size:
+        yield from _solve_batches(iter(lines), backend, as_array, batch_size,
+                                  scheduler, cache)
+        return
+
+    for index, line in enumerate(lines):
+        puzzle = parse_line(line)
+        if puzzle is None:
+            yield SolveResult(index, None, "invalid", [0] * 7, 0.0)
+            continue
+        start = time.perf_counter()
+        grid, report = solve(puzzle.reshape(9, 9), False, backend,
+                             scheduler=scheduler, cache=cache)
+        elapsed = time.perf_counter() - start
+        solution = grid.to_array().ravel().astype(np.uint8)
+        status = "solved" if is_solution(solution) else "broken"
+        yield _result(index, solution, status, report, elapsed, as_array)
+
+
+def _solve_batches(lines, backend, as_array, batch_size, scheduler, cache):
+    index = 0
+    while True:
+        chunk = list(islice(lines, batch_size))
+        if not chunk:
+            return
+        parsed = parse_lines(chunk)
+        valid = [p for p in parsed if p is not None]
+        if valid:
+            solutions, reports, times = solve_batch(
+                np.array(valid), backend, stats=None, scheduler=scheduler,
+                cache=cache)
+            if not as_array:
+                texts = format_solutions(solutions)
+        i = 0
+        for puzzle in parsed:
+            if puzzle is None:
+                yield SolveResult(index, None, "invalid", [0] * 7, 0.0)
+            else:
+                status = "solved" if is_solution(solutions[i]) else "broken"
+                solution = solutions[i] if as_array else texts[i]
+                yield SolveResult(index, solution, status, reports[i],
+                                  float(times[i]))
+                i += 1
+            index += 1
@@ -0,0 +1,99 @@
+# Naked and hidden subsets through Hall's theorem
+# A candidate n of a cell survives only if the other cells of the house can
+# still take different numbers while this cell takes n. That is exactly what
+# every naked or hidden pair, triple and quad (of any size, in fact) removes,
+# and what enumerating all the permutations of a house used to compute.
+#
+# With a perfect matching of cells to numbers, a candidate that is not the
+# matched one is kept iff it lies on an alternating cycle: the cell that
+# holds the number in the matching can pass it on, cell to cell, until some
+# cell takes the number of the first one.
+#################################################
+
+
+# match every cell to a different number, returns (number_of_cell,
+# cell_of_number) as bit indices, or None if the house cannot be completed
+def match_house(masks):
+    number_of_cell = [-1] * len(masks)
+    cell_of_number = [-1] * 9
+    seen = 0
+
+    # Kuhn's augmenting path from cell c
+    def augment(c):
+        nonlocal seen
+        while True:
+            free = masks[c] & ~seen
+            if not free:
+                return False
+            b = free & -free
+            seen |= b
+            n = b.bit_length() - 1
+            other = cell_of_number[n]
+            if other == -1 or augment(other):
+                cell_of_number[n] = c
+                number_of_cell[c] = n
+                return True
+
+    for c in range(len(masks)):
+        # cheap first try: a number nobody holds yet
+        free = masks[c] & ~sum(1 << n for n in number_of_cell if n != -1)
+        if free:
+            n = (free & -free).bit_length() - 1
+            cell_of_number[n] = c
+            number_of_cell[c] = n
+            continue
+        seen = 0
+        if not augment(c):
+            return None
+    return number_of_cell, cell_of_number
+
+
+# candidates of each cell that appear in some valid assignment of the house;
+# all cells come back empty if there is no valid assignment at all
+def restrict_house(masks):
+    size = len(masks)
+    matching = match_house(masks)
+    if matching is None:
+        return [0] * size
+    number_of_cell, cell_of_number = matching
+
+    # reach[c]: cells that c can hand its matched number over to
+    reach = [0] * size
+    for c in range(size):
+        others = masks[c] & ~(1 << number_of_cell[c])
+        while others:
+            b = others & -others
+            others ^= b
+            other = cell_of_number[b.bit_length() - 1]
+            if other != -1:
+                reach[c] |= 1 << other
+
+    # transitive closure, one bit row per cell
+    for k in range(size):
+        kb = 1 << k
+        rk = reach[k]
+        for c in range(size):
+            if reach[c] & kb:
+                reach[c] |= rk
+
+    # cells that could take a number nobody holds (only in short houses)
+    spare = 0
+    unmatched = sum(1 << n for n in range(9) if cell_of_number[n] == -1)
+    for c in range(size):
+        if masks[c] & unmatched:
+            spare |= 1 << c
+
+    out = []
+    for c in range(size):
+        keep = 1 << number_of_cell[c]
+        others = masks[c] & ~keep
+        while others:
+            b = others & -others
+            others ^= b
+            other = cell_of_number[b.bit_length() - 1]
+            # a free number, a cycle back to this cell, or a path to a spare
+            if other == -1 or (reach[other] | 1 << other) & spare \
+                    or reach[other] >> c & 1:
+                keep |= b
+        out.append(keep)
+    return out
@@ -0,0 +1,24 @@
+from candidategrid import CandidateGrid, bit
+from generator import random_grid
+
+# Random candidate grids for the strategy tests: a random solution plus
+# random extra candidates in every cell, so they are consistent and full of
+# pairs, intersections and fish.
+#################################################
+
+
+def random_state(rng, density):
+    solution = random_grid(rng)
+    cells = []
+    for n in solution:
+        extra = int(rng.integers(0, 512)) & int(rng.integers(0, 512))
+        if rng.random() > density:
+            extra = 0
+        cells.append(bit(int(n)) | extra)
+    return CandidateGrid(cells)
+
+
+def to_fixpoint(strategy, s):
+    while strategy(s):
+        pass
+    return s
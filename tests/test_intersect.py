@@ -0,0 +1,74 @@
+import numpy as np
+import pytest
+
+from candidategrid import bit
+from grids import random_state
+from indextables import block_houses, cells_of_house, column_houses, row_houses
+from strategies import intersect
+
+# intersect() works on the 54 block/line triples, all numbers at once; the
+# per-number loop over all block/line regions it replaced is kept here as
+# the reference.
+#################################################
+
+
+def _block_line_region(block, line):
+    sblock = set(cells_of_house[block])
+    sline = set(cells_of_house[line])
+    both = sblock & sline
+    if not both:
+        return None
+    return (tuple(sorted(both)), tuple(sorted(sblock - both)),
+            tuple(sorted(sline - both)))
+
+
+block_line_regions = tuple(
+    tuple(_block_line_region(block, line)
+          for line in list(row_houses) + list(column_houses))
+    for block in block_houses)
+
+
+def n_from_cells(s, cells):
+    numbers = 0
+    for cell in cells:
+        numbers |= s[cell]
+    return numbers
+
+
+def remove_n_from_cells(s, n, cells):
+    count = 0
+    mask = bit(n)
+    for cell in cells:
+        if s[cell] & mask:
+            s[cell] &= ~mask
+            count += 1
+    return count
+
+
+def intersect_reference(s):
+    count = 0
+    for regions in block_line_regions:
+        for region in regions:
+            if region is None:
+                continue
+            both, only_b, only_l = region
+            n_only_b = n_from_cells(s, only_b)
+            n_both = n_from_cells(s, both)
+            n_only_l = n_from_cells(s, only_l)
+            for i in range(1, 10):
+                b = bit(i)
+                if n_both & b and n_only_b & b and not n_only_l & b:
+                    count += remove_n_from_cells(s, i, only_b)
+                if n_both & b and not n_only_b & b and n_only_l & b:
+                    count += remove_n_from_cells(s, i, only_l)
+    return count
+
+
+@pytest.mark.parametrize("density", [0.2, 0.5, 0.8])
+def test_intersect_matches_reference(density):
+    rng = np.random.default_rng(int(density * 10))
+    for _ in range(100):
+        s = random_state(rng, density)
+        expected = s.copy()
+        assert intersect(s) == intersect_reference(expected)
+        assert s == expected
@@ -0,0 +1,105 @@
+import pandas as pd
+import pytest
+
+from instrumentation import StrategyStats
+from main import solve_puzzles
+from resultsink import ResultSink, read_results
+
+easy = [
+    "9...6...37..1.9..5.5.3.4.2.3...5...4.2.6.3.1.4..9.2..6.1.....8.6..8.1..92..5.6..1",
+    "28..57..1..518...776194.85.592734168817...4..6..21879535.8.127417..2.58..28.7.31.",
+]
+solution = "984265173732189465156374928361758294829643517475912836513497682647821359298536741"
+
+
+def stats_of(calls):
+    stats = StrategyStats()
+    stats.record(2, calls, 1000, calls=calls)
+    return stats
+
+
+def add(sink, row_id, stats=None):
+    sink.add(row_id, "Easy", solution, "solved", [0] * 7, 0.5, stats)
+
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / "results.csv")
+
+
+def test_resume_cuts_off_past_checkpoint(path):
+    with ResultSink(path, flush_every=2, source="a") as sink:
+        for i in range(3):
+            add(sink, i, stats_of(1))
+        # a crash halfway through the next write
+        sink.file.write(b"3,3,Easy,sol")
+        sink.file.close()
+        sink.file = None
+
+    sink = ResultSink(path, source="a")
+    assert (sink.done, sink.last_id, sink.stats.calls[2]) == (2, "1", 2)
+    add(sink, 2, stats_of(1))
+    sink.close()
+    rows = list(read_results(path))
+    assert [r.id for r in rows] == ["0", "1", "2"]
+    assert [r.index for r in rows] == [0, 1, 2]
+
+
+def test_close_keeps_rows_without_stats_back(path):
+    # a worker chunk's stats come with its last row; closing in between
+    # must not write the chunk's first rows without them
+    with ResultSink(path, source="a") as sink:
+        add(sink, 0, stats_of(1))
+        add(sink, 1)
+        add(sink, 2)
+    sink = ResultSink(path, source="a")
+    assert (sink.done, sink.last_id, sink.stats.calls[2]) == (1, "0", 1)
+    sink.close()
+
+
+def test_other_source_is_refused(path):
+    with ResultSink(path, source="a") as sink:
+        add(sink, 0, stats_of(1))
+    with pytest.raises(ValueError):
+        ResultSink(path, source="b")
+
+
+def test_finished_run_starts_over(path):
+    with ResultSink(path, source="a") as sink:
+        add(sink, 0, stats_of(1))
+        sink.finish()
+    with ResultSink(path, source="b") as sink:
+        assert sink.done == 0
+    assert list(read_results(path)) == []
+
+
+def puzzles(n):
+    return pd.DataFrame({"id": range(n), "puzzle": [easy[i % 2] for i in range(n)],
+                         "difficulty": ["Easy"] * n})
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_solve_puzzles_resumes(path, workers):
+    # an interrupted run of 5 puzzles: the first 3 are in the file
+    with ResultSink(path, source="a") as sink:
+        solve_puzzles(puzzles(3), 3, stats=StrategyStats(), sink=sink)
+    with open(path + ".checkpoint") as f:
+        checkpoint = f.read().replace('"finished": true', '"finished": false')
+    with open(path + ".checkpoint", "w") as f:
+        f.write(checkpoint)
+
+    stats = StrategyStats()
+    with ResultSink(path, source="a") as sink:
+        assert sink.done == 3
+        run_stats = solve_puzzles(puzzles(5), 5, workers=workers, stats=stats,
+                                  sink=sink)
+    full = StrategyStats()
+    solve_puzzles(puzzles(5), 5, stats=full)
+    assert run_stats.count == 5
+    assert stats.calls == full.calls
+    assert [r.id for r in read_results(path)] == ["0", "1", "2", "3", "4"]
+
+    # that run got to the end: asking for fewer starts over
+    with ResultSink(path, source="a") as sink:
+        assert sink.done == 0
+        assert solve_puzzles(puzzles(2), 2, sink=sink).count == 2
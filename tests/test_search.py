@@ -0,0 +1,50 @@
+import numpy as np
+import pytest
+
+from candidategrid import CandidateGrid
+from dlx import dlx_search
+from generator import random_grid
+from search import search
+from solverapi import is_solution
+
+
+# a random puzzle of few clues, most of them have several solutions
+def sparse_puzzle(rng, clues):
+    puzzle = random_grid(rng).copy()
+    puzzle[rng.permutation(81)[clues:]] = 0
+    return CandidateGrid.from_puzzle(puzzle.reshape(9, 9))
+
+
+def listed(solutions):
+    return sorted(s.to_array().tobytes() for s in solutions)
+
+
+@pytest.mark.parametrize("clues", [26, 30, 33, 36])
+def test_search_lists_what_dlx_lists(clues):
+    rng = np.random.default_rng(clues)
+    limit = 100
+    several = 0
+    for _ in range(40):
+        grid = sparse_puzzle(rng, clues)
+        before = grid.cells[:]
+        found, _ = search(grid, limit)
+        # the trail put every cell back
+        assert grid.cells == before
+        expected, _ = dlx_search(grid, limit)
+        assert grid.cells == before
+        assert all(is_solution(s.to_array()) for s in found)
+        if len(expected) < limit:
+            assert listed(found) == listed(expected)
+            several += len(expected) > 1
+        else:
+            # either could stop at other solutions, but they must be distinct
+            assert len(found) == limit
+            assert len(set(listed(found))) == limit
+    assert several > 0
+
+
+def test_limit_one_leaves_grid_solved():
+    grid = sparse_puzzle(np.random.default_rng(5), 30)
+    found, _ = search(grid)
+    assert len(found) == 1
+    assert grid == found[0]
@@ -0,0 +1,104 @@
+import numpy as np
+
+from generator import random_grid
+from solutioncache import (SolutionCache, canonical_form, map_from_canonical,
+                           map_to_canonical)
+from solverapi import is_solution
+from strategies import solve
+
+
+# a random puzzle with its solution, as 9x9 arrays
+def random_puzzle(rng, clues=30):
+    solution = random_grid(rng).reshape(9, 9)
+    puzzle = solution.copy().ravel()
+    puzzle[rng.permutation(81)[clues:]] = 0
+    return puzzle.reshape(9, 9), solution
+
+
+# one random layout under the Sudoku symmetries, the same for every grid
+def random_symmetry(rng):
+    transposed = bool(rng.integers(2))
+    rows = np.concatenate([3 * b + rng.permutation(3) for b in rng.permutation(3)])
+    cols = np.concatenate([3 * b + rng.permutation(3) for b in rng.permutation(3)])
+    digits = np.concatenate([[0], rng.permutation(9) + 1]).astype(np.uint8)
+
+    def apply(grid):
+        g = np.asarray(grid, dtype=np.uint8)
+        g = digits[(g.T if transposed else g)[np.ix_(rows, cols)]]
+        return g
+    return apply
+
+
+def fits(puzzle, solution):
+    return is_solution(solution) and \
+        ((puzzle == 0) | (puzzle == solution)).all()
+
+
+def test_canonical_round_trip():
+    rng = np.random.default_rng(15)
+    for _ in range(50):
+        puzzle, solution = random_puzzle(rng)
+        key, transform = canonical_form(puzzle)
+        canonical = map_to_canonical(solution, transform)
+        assert (map_from_canonical(canonical, transform) == solution).all()
+        # the givens themselves land on the key
+        givens = map_to_canonical(puzzle, transform)
+        assert (givens.ravel() + ord("0")).astype(np.uint8).tobytes() == key
+
+
+def test_transformed_puzzles_hit():
+    rng = np.random.default_rng(16)
+    cache = SolutionCache()
+    hits = 0
+    for _ in range(20):
+        puzzle, solution = random_puzzle(rng)
+        cache.put(puzzle, solution)
+        for _ in range(5):
+            apply = random_symmetry(rng)
+            moved = apply(puzzle)
+            found = cache.get(moved)
+            if found is not None:
+                hits += 1
+                assert fits(moved, found)
+    # the canonical form is not exact, but most layouts must meet
+    assert hits >= 80
+
+
+def test_lru_evicts_oldest():
+    rng = np.random.default_rng(17)
+    cache = SolutionCache(maxsize=4)
+    puzzles = [random_puzzle(rng) for _ in range(3)]
+    for puzzle, solution in puzzles:
+        cache.put(puzzle, solution)
+    # every puzzle is kept under its canonical key and its exact givens
+    assert len(cache) == 4
+    assert cache.get(puzzles[0][0]) is None
+    assert fits(puzzles[2][0], cache.get(puzzles[2][0]))
+
+
+def test_sqlite_persists(tmp_path):
+    rng = np.random.default_rng(18)
+    path = str(tmp_path / "solutions.sqlite")
+    puzzles = [random_puzzle(rng) for _ in range(5)]
+    with SolutionCache(path=path) as cache:
+        for puzzle, solution in puzzles:
+            cache.put(puzzle, solution)
+    with SolutionCache(maxsize=1, path=path) as cache:
+        for puzzle, solution in puzzles:
+            assert fits(puzzle, cache.get(puzzle))
+        assert cache.hits == 5
+
+
+def test_solve_caches_only_solutions():
+    rng = np.random.default_rng(19)
+    cache = SolutionCache()
+    broken = random_grid(rng).reshape(9, 9).astype(int)
+    broken[0, 0] = broken[0, 1]
+    solve(broken, False, cache=cache)
+    assert len(cache) == 0
+
+    puzzle, solution = random_puzzle(rng)
+    solve(puzzle, False, cache=cache)
+    grid, _ = solve(puzzle, False, cache=cache)
+    assert cache.hits == 1
+    assert fits(puzzle, grid.to_array())
@@ -0,0 +1,29 @@
+import numpy as np
+import pytest
+
+from generator import random_grid
+from strategies import backends, solve
+
+
+@pytest.fixture
+def full_grid():
+    return random_grid(np.random.default_rng(6)).reshape(9, 9).astype(int)
+
+
+@pytest.mark.parametrize("backend", backends)
+def test_full_grid_is_its_own_solution(full_grid, backend):
+    solutions, _ = solve(full_grid, False, backend=backend, count_limit=2)
+    assert len(solutions) == 1
+    assert (solutions[0].to_array() == full_grid).all()
+
+
+@pytest.mark.parametrize("backend", backends)
+def test_full_grid_with_duplicate_has_no_solution(full_grid, backend):
+    full_grid[0, 0] = full_grid[0, 1]
+    solutions, _ = solve(full_grid, False, backend=backend, count_limit=2)
+    assert solutions == []
+
+
+def test_unknown_backend():
+    with pytest.raises(ValueError):
+        solve(np.zeros((9, 9), int), False, backend="guess")
@@ -0,0 +1,66 @@
+import numpy as np
+
+from candidategrid import bit, digits, popcount
+from grids import random_state
+from indextables import cells_of_house
+from strategies import csp
+from subsets import restrict_house
+
+# restrict_house replaced csp_list, which enumerated every assignment of
+# the house; it is kept here as the reference.
+#################################################
+
+
+def csp_list(inp):
+    perm = []
+
+    def append_permutations(sofar):
+        for n in inp[len(sofar)]:
+            if len(sofar) == len(inp) - 1:
+                perm.append(sofar + [n])
+            else:
+                append_permutations(sofar + [n])
+
+    append_permutations([])
+    perm = [p for p in perm if len(p) == len(set(p))]
+    return [[n for n in range(10) if any(p[i] == n for p in perm)]
+            for i in range(len(inp))]
+
+
+def to_masks(house):
+    masks = []
+    for numbers in house:
+        mask = 0
+        for n in numbers:
+            mask |= bit(n)
+        masks.append(mask)
+    return masks
+
+
+def test_restrict_house_matches_csp_list():
+    rng = np.random.default_rng(4)
+    checked = 0
+    while checked < 2000:
+        masks = [int(rng.integers(1, 512)) & int(rng.integers(0, 512))
+                 for _ in range(9)]
+        sizes = np.prod([max(popcount(m), 1) for m in masks], dtype=float)
+        if sizes > 20000:
+            continue
+        expected = to_masks(csp_list([list(digits(m)) for m in masks]))
+        assert restrict_house(masks) == expected, masks
+        checked += 1
+
+
+def test_csp_matches_csp_list():
+    rng = np.random.default_rng(5)
+    for _ in range(30):
+        s = random_state(rng, 0.3)
+        expected = s.cells[:]
+        for group in cells_of_house:
+            house = to_masks(csp_list([list(digits(expected[k])) for k in group]))
+            for k, mask in zip(group, house):
+                expected[k] = mask
+        before = sum(popcount(c) for c in s.cells)
+        removed = csp(s)
+        assert s.cells == expected
+        assert removed == before - sum(popcount(c) for c in s.cells)
@@ -0,0 +1,153 @@
+import argparse
+import sys
+import time
+
+import numpy as np
+
+from batchsolver import candidates_tensor, n_candidates, singles, to_grid
+from candidategrid import CandidateGrid
+from search import search
+from solverapi import parse_lines
+
+# Solution counting and corpus validation
+# A puzzle is only fit for the solver if it has exactly one solution. Counting
+# stops as soon as `limit` solutions are found, so telling unique puzzles
+# from the rest costs at most a second solution's worth of search.
+# Singles go first: a puzzle they finish is unique (every step was forced)
+# and one they break has no solution, so only what they leave is searched.
+#
+# Validating a corpus runs the singles vectorized over whole chunks of
+# lines, like solve_batch(), and counts the rest one by one.
+#################################################
+
+# status codes, index into status_names
+UNIQUE, INVALID, UNSOLVABLE, MULTIPLE, MISMATCH = range(5)
+status_names = ("unique", "invalid", "unsolvable", "multiple", "mismatch")
+
+
+def count_solutions(puzzle, limit=2):
+    """Number of solutions of a puzzle, counted up to limit.
+
+    puzzle: a 9x9 array or 81 numbers, 0 for empty cells, or a
+    CandidateGrid, which is left untouched. count_solutions(p) == 1 is
+    the uniqueness check.
+    """
+    if isinstance(puzzle, CandidateGrid):
+        grid = puzzle.copy()
+    else:
+        grid = CandidateGrid.from_puzzle(np.asarray(puzzle).reshape(9, 9))
+    solutions, _ = search(grid, limit)
+    return len(solutions)
+
+
+def validate_puzzles(puzzles, solutions=None):
+    """Status code of every puzzle, and its solution if it is unique.
+
+    puzzles: (N, 81) numbers, 0 for empty cells. With solutions, (N, 81)
+    expected answers, a unique puzzle whose answer differs is a MISMATCH.
+    Returns ((N,) uint8 status codes, (N, 81) uint8 solutions, 0 unless
+    the puzzle is unique).
+    """
+    puzzles = np.asarray(puzzles).reshape(-1, 81)
+    status = np.full(len(puzzles), UNIQUE, dtype=np.uint8)
+    found = np.zeros(puzzles.shape, dtype=np.uint8)
+
+    cand, _, _, broken = singles(candidates_tensor(puzzles))
+    solved = (n_candidates(cand) == 1).all(axis=1) & ~broken
+    status[broken] = UNSOLVABLE
+    found[solved] = cand[solved].argmax(axis=2) + 1
+
+    for i in np.flatnonzero(~solved & ~broken):
+        answers, _ = search(to_grid(cand[i]), 2)
+        if len(answers) == 1:
+            found[i] = answers[0].to_array().ravel()
+        else:
+            status[i] = MULTIPLE if answers else UNSOLVABLE
+
+    if solutions is not None:
+        expected = np.asarray(solutions).reshape(-1, 81)
+        differs = (found != expected).any(axis=1)
+        status[(status == UNIQUE) & differs] = MISMATCH
+    return status, found
+
+
+def validate_lines(lines, solution_lines=None):
+    """(N,) uint8 status codes of puzzle lines, INVALID for malformed ones.
+
+    With solution_lines, a malformed expected solution also makes its row
+    INVALID, and wrong ones are a MISMATCH.
+    """
+    parsed = parse_lines(lines)
+    ok = np.array([p is not None for p in parsed], dtype=bool)
+    if solution_lines is not None:
+        answers = parse_lines(solution_lines)
+        ok &= np.array([a is not None and a.all() for a in answers],
+                       dtype=bool)
+    status = np.full(len(parsed), INVALID, dtype=np.uint8)
+    rows = np.flatnonzero(ok)
+    if len(rows):
+        puzzles = np.array([parsed[i] for i in rows])
+        expected = None
+        if solution_lines is not None:
+            expected = np.array([answers[i] for i in rows])
+        status[rows], _ = validate_puzzles(puzzles, expected)
+    return status
+
+
+def validate_corpus(filename, chunk_size=100000, check_solutions=False,
+                    limit=None):
+    """Validate the puzzle CSV chunk by chunk.
+
+    Returns (counts, flagged): rows per status name, and (id, status name)
+    of every row that is not unique. With check_solutions, the solution
+    column is checked against the puzzle's only solution.
+    """
+    import pandas as pd
+    columns = ['id', 'puzzle'] + (['solution'] if check_solutions else [])
+    reader = pd.read_csv(filename, usecols=columns, dtype=str,
+                         keep_default_na=False, nrows=limit,
+                         chunksize=chunk_size)
+    counts = dict.fromkeys(status_names, 0)
+    flagged = []
+    for chunk in reader:
+        status = validate_lines(
+            chunk['puzzle'].tolist(),
+            chunk['solution'].tolist() if check_solutions else None)
+        for code, n in enumerate(np.bincount(status, minlength=5)):
+            counts[status_names[code]] += int(n)
+        for i in np.flatnonzero(status != UNIQUE):
+            flagged.append((chunk['id'].iat[i], status_names[status[i]]))
+    return counts, flagged
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Flag invalid, unsolvable and non-unique puzzles.")
+    parser.add_argument("csv", nargs="?", default="sudoku-3m.csv")
+    parser.add_argument("--chunk-size", type=int, default=100000)
+    parser.add_argument("--limit", type=int, help="only the first rows")
+    parser.add_argument("--check-solutions", action="store_true",
+                        help="also compare with the solution column")
+    parser.add_argument("--output", help="write the flagged rows as CSV here")
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    counts, flagged = validate_corpus(args.csv, args.chunk_size,
+                                      args.check_solutions, args.limit)
+    elapsed = time.perf_counter() - start
+    rows = sum(counts.values())
+    for name in status_names:
+        print("%-10s %10d" % (name, counts[name]))
+    print("%d rows in %.1fs, %.0f rows/s" %
+          (rows, elapsed, rows / elapsed if elapsed > 0 else 0.0))
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write("id,status\n")
+            for row_id, name in flagged:
+                f.write("%s,%s\n" % (row_id, name))
+        print("Wrote", args.output)
+    return 1 if flagged else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())